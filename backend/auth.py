@@ -1,17 +1,29 @@
 """
 JWT Authentication – registration, login, token validation.
-Uses bcrypt for hashing and python-jose for JWT.
+Uses bcrypt (or argon2id, see PASSWORD_HASHER) for hashing and PyJWT for JWT.
 """
 
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional
-
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import time
+
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+import jwt
+from jwt import PyJWTError
 import bcrypt as _bcrypt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, lambda_stmt, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
 
 from config import settings
 from database import get_db
@@ -20,101 +32,212 @@ from models import User
 # ── Crypto Setup ──────────────────────────────────────────────────────────────
 
 # Use bcrypt directly – passlib 1.7.4 is incompatible with bcrypt ≥4.0
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-
+# Password hashing is CPU-bound and releases the GIL, so it runs on its own pool
+# instead of blocking the event loop for every login/registration.
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="pwhash")
 
-# ── Password Utilities ────────────────────────────────────────────────────────
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def _encode_password(password: str) -> bytes:
-    """Encode and truncate to 72 bytes (bcrypt hard limit)."""
-    return password.encode("utf-8")[:72]
+# Verified JWT payloads keyed by a 128-bit BLAKE2b digest of the raw token (never
+# the token itself) – only used as an in-memory key, so speed beats SHA-256 here.
+# Entries are also checked against their own "exp" claim on every hit.
+_TOKEN_CACHE: TTLCache = TTLCache(
+    maxsize=10_000, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
 
+# Short-lived user_id → column values, so a verified token resolves without SQL.
+# Detached identity only; the password hash is never kept here.
+_USER_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_USER_CACHE_FIELDS = tuple(
+    c.key for c in User.__table__.columns if c.key != "hashed_password"
+)
 
-def hash_password(password: str) -> str:
-    return _bcrypt.hashpw(_encode_password(password), _bcrypt.gensalt()).decode("utf-8")
 
+# ── Password Utilities ────────────────────────────────────────────────────────
 
-def verify_password(plain: str, hashed: str) -> bool:
+@lru_cache(maxsize=1)
+def _argon2_hasher():
+    """argon2id hasher; lanes are spread across all cores."""
     try:
-        return _bcrypt.checkpw(_encode_password(plain), hashed.encode("utf-8"))
+        from argon2 import PasswordHasher
+    except ImportError:
+        raise ImportError("Install argon2-cffi: pip install argon2-cffi")
+    return PasswordHasher(time_cost=2, memory_cost=64_000, parallelism=os.cpu_count() or 1)
+
+
+# Salt entropy is drawn from os.urandom in 4 KiB blocks and sliced 16 bytes at a
+# time, so registration bursts don't pay one getrandom syscall per hash.
+_SALT_POOL = bytearray()
+_SALT_LOCK = threading.Lock()
+_BCRYPT_B64 = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+    b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+)
+
+
+def _fast_salt(rounds: int) -> bytes:
+    """Equivalent of bcrypt.gensalt(rounds), fed from a shared urandom buffer."""
+    with _SALT_LOCK:
+        if len(_SALT_POOL) < 16:
+            _SALT_POOL.extend(os.urandom(4096))
+        raw = bytes(_SALT_POOL[:16])
+        del _SALT_POOL[:16]
+    return b"$2b$%02d$" % rounds + base64.b64encode(raw)[:22].translate(_BCRYPT_B64)
+
+
+def _hash_password_sync(password: str) -> str:
+    if settings.PASSWORD_HASHER == "argon2id":
+        return _argon2_hasher().hash(password)
+    salt = _fast_salt(settings.BCRYPT_COST)
+    # Truncate to 72 bytes (bcrypt hard limit)
+    return _bcrypt.hashpw(password.encode("utf-8")[:72], salt).decode("utf-8")
+
+
+def _verify_password_sync(plain: str, hashed: str) -> bool:
+    # Dispatch on the stored hash so switching PASSWORD_HASHER keeps old logins valid
+    try:
+        if hashed.startswith("$argon2"):
+            return _argon2_hasher().verify(hashed, plain)
+        return _bcrypt.checkpw(plain.encode("utf-8")[:72], hashed.encode("utf-8"))
     except Exception:
         return False
 
 
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_HASH_POOL, _hash_password_sync, password)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_HASH_POOL, _verify_password_sync, plain, hashed)
+
+
 # ── JWT Utilities ─────────────────────────────────────────────────────────────
 
+_ACCESS_TOKEN_TTL_S = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-    to_encode.update({"exp": expire})
+    ttl = int(expires_delta.total_seconds()) if expires_delta else _ACCESS_TOKEN_TTL_S
+    to_encode["exp"] = int(time.time()) + ttl
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
 def decode_token(token: str) -> dict:
+    """Verify a JWT, skipping the HMAC check for tokens already seen and unexpired."""
+    key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    cached = _TOKEN_CACHE.get(key)
+    if cached is not None and cached["exp"] > time.time():
+        return cached
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+    except PyJWTError:
+        _TOKEN_CACHE.pop(key, None)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token invalid or expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Only successfully verified, expiring tokens are cached – failures never are
+    if isinstance(payload.get("exp"), (int, float)):
+        _TOKEN_CACHE[key] = payload
+    return payload
+
 
 # ── DB Utilities ──────────────────────────────────────────────────────────────
 
+# Built once; lambda_stmt skips re-hashing the select() for the statement cache
+_USER_BY_EMAIL = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
+_USER_BY_ID    = lambda_stmt(lambda: select(User).where(User.id == bindparam("user_id")))
+
+
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(_USER_BY_EMAIL, {"email": email})
     return result.scalar_one_or_none()
 
 
 async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(_USER_BY_ID, {"user_id": user_id})
     return result.scalar_one_or_none()
 
 
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop a cached identity – call after any change to the user row."""
+    _USER_CACHE.pop(user_id, None)
+
+
+def _user_from_cache(data: dict) -> User:
+    """Build a fresh detached User per request; db.add() on it emits an UPDATE."""
+    user = User(**data)
+    make_transient_to_detached(user)
+    return user
+
+
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     user = await get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password(password, user.hashed_password):
         return None
     return user
 
 
 async def create_user(db: AsyncSession, email: str, password: str,
                        full_name: Optional[str] = None) -> User:
-    existing = await get_user_by_email(db, email)
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Email already registered",
-        )
+    # No SELECT pre-check: the UNIQUE(email) constraint is the atomic source of truth
     user = User(
         email=email,
-        hashed_password=hash_password(password),
+        hashed_password=await hash_password(password),
         full_name=full_name,
     )
     db.add(user)
-    await db.flush()
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered",
+        )
     await db.refresh(user)
+    invalidate_user_cache(user.id)
     return user
 
 
 # ── FastAPI Dependency ────────────────────────────────────────────────────────
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+def _user_id_from_token(token: str) -> int:
     payload = decode_token(token)
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid token payload")
-    user = await get_user_by_id(db, int(user_id))
+    return int(user_id)
+
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    Claims-only identity: verified JWT → user id, no DB session or query.
+    Use on endpoints that only scope queries by user; keep get_current_user
+    where the User row itself is read or mutated.
+    """
+    return _user_id_from_token(token)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user_id = _user_id_from_token(token)
+    cached = _USER_CACHE.get(user_id)
+    if cached is not None:
+        return _user_from_cache(cached)
+
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="User not found")
+    _USER_CACHE[user_id] = {f: getattr(user, f) for f in _USER_CACHE_FIELDS}
     return user
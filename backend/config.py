@@ -4,7 +4,8 @@ All environment-driven settings with sane defaults.
 """
 
 from pydantic_settings import BaseSettings
-from functools import lru_cache
+from functools import cached_property, lru_cache
+from typing import Literal
 import os
 
 
@@ -18,6 +19,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "internai-super-secret-change-in-production-2026"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    PASSWORD_HASHER: Literal["bcrypt", "argon2id"] = "bcrypt"
+    BCRYPT_COST: int = 12                # log2 rounds – lower (e.g. 10) for dev laptops
 
     # ── Database (PostgreSQL) ──────────────────────────────────────────────
     POSTGRES_USER: str = "internai"
@@ -26,14 +29,15 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
-    @property
+    # Built once per Settings instance (pydantic v2 supports cached_property)
+    @cached_property
     def DATABASE_URL(self) -> str:
         return (
             f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
-    @property
+    @cached_property
     def DATABASE_URL_SYNC(self) -> str:
         return (
             f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
@@ -67,6 +71,8 @@ class Settings(BaseSettings):
     GITHUB_API_BASE: str = "https://api.github.com"
     GITHUB_TOKEN: str = ""               # optional – set for higher rate limits
     GITHUB_MAX_REPOS: int = 20
+    GITHUB_RPS: float = 5.0              # token-bucket rate across all GitHub calls (burst = 1s worth)
+    GITHUB_REDIS_URL: str = ""           # optional – e.g. redis://localhost:6379/0 to share GitHub responses across workers
 
     # ── ATS Scoring Weights ───────────────────────────────────────────────
     ATS_KEYWORD_WEIGHT: float = 0.40
@@ -84,6 +90,15 @@ class Settings(BaseSettings):
 
     # ── RAG Settings ──────────────────────────────────────────────────────
     RAG_TOP_K: int = 5                   # chunks retrieved per query
+    RAG_CACHE_TTL: int = 900             # seconds a retrieval result is reused
+    RAG_CACHE_THRESHOLD: float = 0.93    # JD cosine similarity for a soft hit
+
+    # ── Semantic Cache (reuse LLM outputs for repeated JDs) ───────────────
+    SEMANTIC_CACHE_SIZE: int = 512
+    SEMANTIC_CACHE_TTL: int = 3600       # seconds
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95   # JD cosine similarity for a soft hit
+    RESULT_CACHE_TTL: int = 900          # seconds an ATS analysis/score is reused
+    CACHE_VECTORS_INT8: bool = True      # int8 + scale for cached JD vectors (False → float32)
 
     # ── PDF Export ────────────────────────────────────────────────────────
     PDF_FONT_SIZE: int = 10
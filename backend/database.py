@@ -5,6 +5,8 @@ Single source of truth for all database sessions.
 
 from __future__ import annotations
 from typing import Optional
+import threading
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 import chromadb
@@ -16,12 +18,20 @@ from config import settings
 
 # ── SQLAlchemy Async Engine ───────────────────────────────────────────────────
 
+# No pre-ping: asyncpg surfaces dead connections itself, and pool_recycle retires
+# idle ones, so every checkout no longer pays an extra SELECT 1 round-trip.
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=False,
+    pool_recycle=1800,
+    connect_args={
+        "prepared_statement_cache_size": 500,   # SQLAlchemy-side prepared stmts
+        "statement_cache_size": 500,            # asyncpg-side statement cache
+        "server_settings": {"jit": "off"},      # PG JIT only slows short OLTP queries
+    },
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -55,6 +65,64 @@ async def create_tables() -> None:
     """Create all tables (called at startup)."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "ALTER TABLE resumes ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32)"
+        ))
+        for ddl in _ADDED_INDEXES:
+            await conn.execute(text(ddl))
+        await _ensure_skill_name_index(conn)
+
+
+# Indexes added to models after their tables shipped: create_all() skips tables
+# that already exist, so older databases get them here (no-op once present).
+_ADDED_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_jobapp_user_created ON job_applications (user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_jobapp_user_ats ON job_applications (user_id, ats_score) "
+    "WHERE ats_score IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_experiences_user_id ON experiences (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_github_repos_user_id ON github_repos (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_skills_user_id ON skills (user_id)",
+)
+
+
+# create_all() only builds indexes for tables it creates, so databases from before
+# the unique (user_id, lower(name)) skill index get their duplicates folded into
+# the lowest-id row and the index added here, once.
+_MERGE_DUPLICATE_SKILLS = text("""
+    WITH dup AS (
+        SELECT user_id, lower(name) AS lname, min(id) AS keep_id,
+               sum(coalesce(frequency, 1)) AS freq
+        FROM skills GROUP BY user_id, lower(name) HAVING count(*) > 1
+    ), src AS (
+        SELECT d.keep_id, json_agg(DISTINCT e.value) AS srcs
+        FROM dup d
+        JOIN skills s ON s.user_id = d.user_id AND lower(s.name) = d.lname
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE WHEN json_typeof(s.sources) = 'array' THEN s.sources ELSE '[]'::json END
+        ) AS e(value)
+        GROUP BY d.keep_id
+    )
+    UPDATE skills s
+    SET frequency = d.freq, sources = coalesce(src.srcs, s.sources)
+    FROM dup d LEFT JOIN src ON src.keep_id = d.keep_id
+    WHERE s.id = d.keep_id
+""")
+
+_DELETE_DUPLICATE_SKILLS = text("""
+    DELETE FROM skills s USING skills k
+    WHERE s.user_id = k.user_id AND lower(s.name) = lower(k.name) AND s.id > k.id
+""")
+
+
+async def _ensure_skill_name_index(conn) -> None:
+    exists = await conn.scalar(text("SELECT to_regclass('ux_skills_user_lower_name')"))
+    if exists is not None:
+        return
+    await conn.execute(_MERGE_DUPLICATE_SKILLS)
+    await conn.execute(_DELETE_DUPLICATE_SKILLS)
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX ux_skills_user_lower_name ON skills (user_id, lower(name))"
+    ))
 
 
 # ── ChromaDB Client ───────────────────────────────────────────────────────────
@@ -68,13 +136,16 @@ def get_chroma_client() -> ChromaClient:
 
 
 _chroma_client: Optional[ChromaClient] = None
+_chroma_lock = threading.Lock()
 
 
 def chroma_client() -> ChromaClient:
-    """Lazy singleton ChromaDB client."""
+    """Lazy singleton ChromaDB client (double-checked lock – one PersistentClient per process)."""
     global _chroma_client
     if _chroma_client is None:
-        _chroma_client = get_chroma_client()
+        with _chroma_lock:
+            if _chroma_client is None:
+                _chroma_client = get_chroma_client()
     return _chroma_client
 
 
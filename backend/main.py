@@ -10,15 +10,18 @@ Starts the API server with:
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 
 from config import settings
-from database import create_tables
+from database import create_tables, chroma_client
 from routers import auth, profile, applications, analytics
-from services.llm_service import is_ollama_running, is_model_available
+from services.llm_service import is_ollama_running, is_model_available, close_ollama_client
+from services.github_service import close_gh_client
+from services.pdf_generator import shutdown_render_pool
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 
@@ -53,6 +56,13 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("⚠️  Ollama is NOT running. Start with: ollama serve")
 
+    # Open ChromaDB once up front so the first request doesn't pay the HNSW load
+    try:
+        chroma_client()
+        logger.info("✅ ChromaDB ready")
+    except Exception as e:
+        logger.warning(f"⚠️  ChromaDB init failed: {e}")
+
     # Pre-warm embedding model (loads ~22MB into RAM)
     try:
         from services.rag_service import get_embedding_model
@@ -65,6 +75,8 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down InternAI backend...")
+    shutdown_render_pool()
+    await asyncio.gather(close_ollama_client(), close_gh_client())
 
 
 # ── App Factory ────────────────────────────────────────────────────────────────
@@ -78,6 +90,7 @@ app = FastAPI(
     ),
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
@@ -99,10 +112,9 @@ app.add_middleware(
 
 @app.middleware("http")
 async def add_process_time(request: Request, call_next):
-    start = time.time()
+    start = time.perf_counter_ns()
     response = await call_next(request)
-    duration = round((time.time() - start) * 1000, 1)
-    response.headers["X-Process-Time-Ms"] = str(duration)
+    response.headers["X-Process-Time-Ms"] = f"{(time.perf_counter_ns() - start) / 1_000_000:.1f}"
     return response
 
 
@@ -127,6 +139,28 @@ app.include_router(analytics.router)
 
 # ── Health & Status Endpoints ─────────────────────────────────────────────────
 
+# Uptime monitors poll /health constantly; collapse them into one Ollama probe
+# per _HEALTH_TTL_S window. The lock makes concurrent callers share that probe.
+_HEALTH_TTL_S = 5.0
+_health_lock = asyncio.Lock()
+_health_cache: tuple[float, bool, bool] = (0.0, False, False)  # (checked_at, ollama_ok, model_ok)
+
+
+async def _probe_ollama() -> tuple[bool, bool]:
+    global _health_cache
+    checked_at, ollama_ok, model_ok = _health_cache
+    if time.monotonic() - checked_at < _HEALTH_TTL_S:
+        return ollama_ok, model_ok
+    async with _health_lock:
+        checked_at, ollama_ok, model_ok = _health_cache
+        if time.monotonic() - checked_at < _HEALTH_TTL_S:
+            return ollama_ok, model_ok
+        ollama_ok = await is_ollama_running()
+        model_ok  = await is_model_available(settings.PRIMARY_MODEL) if ollama_ok else False
+        _health_cache = (time.monotonic(), ollama_ok, model_ok)
+        return ollama_ok, model_ok
+
+
 @app.get("/", tags=["Health"])
 async def root():
     return {
@@ -139,8 +173,7 @@ async def root():
 
 @app.get("/health", tags=["Health"])
 async def health():
-    ollama_ok = await is_ollama_running()
-    model_ok  = await is_model_available(settings.PRIMARY_MODEL) if ollama_ok else False
+    ollama_ok, model_ok = await _probe_ollama()
     return {
         "status":        "healthy" if ollama_ok else "degraded",
         "ollama":        "running" if ollama_ok else "offline",
@@ -153,8 +186,7 @@ async def health():
 @app.get("/health/detailed", tags=["Health"])
 async def health_detailed():
     from services.rag_service import get_embedding_model
-    ollama_ok  = await is_ollama_running()
-    model_ok   = await is_model_available(settings.PRIMARY_MODEL) if ollama_ok else False
+    ollama_ok, model_ok = await _probe_ollama()
     try:
         _ = get_embedding_model()
         emb_ok = True
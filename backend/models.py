@@ -4,7 +4,7 @@ SQLAlchemy ORM Models – Production-ready schema.
 
 from sqlalchemy import (
     Column, Integer, String, Text, Float, DateTime,
-    ForeignKey, JSON, Enum as SAEnum
+    ForeignKey, JSON, Index, Enum as SAEnum, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -39,13 +39,15 @@ class User(Base):
     experiences      = relationship("Experience", back_populates="user",
                                     cascade="all, delete-orphan")
     github_repos     = relationship("GitHubRepo", back_populates="user",
-                                    cascade="all, delete-orphan")
+                                    cascade="all, delete-orphan",
+                                    order_by="GitHubRepo.stars.desc()")
     linkedin_profile = relationship("LinkedInProfile", back_populates="user",
                                     uselist=False, cascade="all, delete-orphan")
     job_applications = relationship("JobApplication", back_populates="user",
                                     cascade="all, delete-orphan")
     skills           = relationship("Skill", back_populates="user",
-                                    cascade="all, delete-orphan")
+                                    cascade="all, delete-orphan",
+                                    order_by="Skill.frequency.desc()")
 
 
 # ── Resume ────────────────────────────────────────────────────────────────────
@@ -58,6 +60,7 @@ class Resume(Base):
     file_name        = Column(String(255), nullable=True)
     raw_text         = Column(Text, nullable=False)
     parsed_sections  = Column(JSON, nullable=True)   # {education:[], experience:[], skills:[]}
+    content_hash     = Column(String(32), nullable=True)  # blake2b-128 hex of the uploaded file
     chroma_indexed   = Column(Integer, default=0)    # 1 = indexed in ChromaDB
     updated_at       = Column(DateTime(timezone=True),
                                server_default=func.now(), onupdate=func.now())
@@ -71,7 +74,7 @@ class Experience(Base):
     __tablename__ = "experiences"
 
     id          = Column(Integer, primary_key=True, index=True)
-    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     source      = Column(SAEnum(SourceType), nullable=False)
     title       = Column(String(500), nullable=True)
     company     = Column(String(500), nullable=True)
@@ -108,7 +111,7 @@ class GitHubRepo(Base):
     __tablename__ = "github_repos"
 
     id             = Column(Integer, primary_key=True, index=True)
-    user_id        = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id        = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     repo_name      = Column(String(255), nullable=False)
     description    = Column(Text, nullable=True)
     language       = Column(String(100), nullable=True)
@@ -128,9 +131,13 @@ class GitHubRepo(Base):
 
 class Skill(Base):
     __tablename__ = "skills"
+    __table_args__ = (
+        # One row per skill per user, case-insensitive – target of the bulk upsert
+        Index("ux_skills_user_lower_name", "user_id", func.lower(text("name")), unique=True),
+    )
 
     id          = Column(Integer, primary_key=True, index=True)
-    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name        = Column(String(200), nullable=False)
     category    = Column(String(100), nullable=True)   # ML, NLP, DevOps, etc.
     frequency   = Column(Integer, default=1)           # occurrences across sources
@@ -145,6 +152,12 @@ class Skill(Base):
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
+    __table_args__ = (
+        # Every list/analytics query filters by user and orders newest-first
+        Index("ix_jobapp_user_created", "user_id", text("created_at DESC")),
+        Index("ix_jobapp_user_ats", "user_id", "ats_score",
+              postgresql_where=text("ats_score IS NOT NULL")),
+    )
 
     id                = Column(Integer, primary_key=True, index=True)
     user_id           = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -3,13 +3,15 @@ Analytics Router – dashboard statistics, skill gaps, trends.
 """
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult, AsyncScalarResult
+from sqlalchemy import select, func, desc, text
 from collections import Counter
+from itertools import chain
 
 from database import get_db
-from auth import get_current_user
-from models import User, JobApplication, Skill
+from auth import get_current_user_id
+from models import JobApplication, Skill
 from schemas import AnalyticsSummary
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
@@ -18,12 +20,34 @@ router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 @router.get("/summary", response_model=AnalyticsSummary)
 async def get_summary(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    """Full analytics summary for dashboard."""
-    apps = await _get_all_apps(db, current_user.id)
-
-    if not apps:
+    """Full analytics summary for dashboard – aggregated in SQL, no row loading."""
+    user_filter = JobApplication.user_id == current_user_id
+
+    # ATS stats + status breakdown, fused into one GROUP BY status scan
+    status_result = await db.execute(
+        select(
+            JobApplication.status,
+            func.count(),
+            func.count(JobApplication.ats_score),
+            func.sum(JobApplication.ats_score),
+            func.max(JobApplication.ats_score),
+        )
+        .where(user_filter)
+        .group_by(JobApplication.status)
+    )
+    total, n_scored, score_sum, high = 0, 0, 0.0, None
+    status_count: dict[str, int] = {}
+    for st, n, n_st_scored, st_sum, st_max in status_result.all():
+        status_count[st] = n
+        total += n
+        if n_st_scored:
+            n_scored  += n_st_scored
+            score_sum += float(st_sum)
+            high = st_max if high is None or st_max > high else high
+
+    if not total:
         return AnalyticsSummary(
             total_applications=0,
             average_ats_score=0.0,
@@ -34,28 +58,25 @@ async def get_summary(
             recent_trend=[],
         )
 
-    # ATS stats
-    scores = [a.ats_score for a in apps if a.ats_score is not None]
-    avg_ats  = round(sum(scores) / len(scores), 1) if scores else 0.0
-    high_ats = round(max(scores), 1) if scores else 0.0
-
-    # Missing skills aggregation
-    missing_counter: Counter = Counter()
-    for app in apps:
-        for skill in (app.missing_skills or []):
-            missing_counter[skill] += 1
-    top_missing = [{"skill": k, "count": v}
-                   for k, v in missing_counter.most_common(10)]
-
-    # Status breakdown
-    status_count: dict[str, int] = {}
-    for app in apps:
-        status_count[app.status] = status_count.get(app.status, 0) + 1
+    avg_ats  = round(score_sum / n_scored, 1) if n_scored else 0.0
+    high_ats = round(float(high), 1) if high is not None else 0.0
+
+    # Missing skills aggregation (unnest the JSON array per row)
+    skill = func.json_array_elements_text(JobApplication.missing_skills).column_valued("skill")
+    missing_result = await db.execute(
+        select(skill, func.count().label("count"))
+        .select_from(JobApplication)             # table first: implicit LATERAL
+        .where(user_filter, func.json_typeof(JobApplication.missing_skills) == "array")
+        .group_by(skill)
+        .order_by(desc("count"), skill)
+        .limit(10)
+    )
+    top_missing = [{"skill": k, "count": v} for k, v in missing_result.all()]
 
     # Skill strength ranking from profile
     skill_result = await db.execute(
         select(Skill.name, Skill.category, Skill.frequency)
-        .where(Skill.user_id == current_user.id)
+        .where(Skill.user_id == current_user_id)
         .order_by(desc(Skill.frequency))
         .limit(20)
     )
@@ -65,21 +86,24 @@ async def get_summary(
     ]
 
     # Monthly trend (avg ATS score per month, last 6 months)
-    monthly: dict[str, list[float]] = {}
-    for app in apps:
-        if app.ats_score and app.created_at:
-            month_key = app.created_at.strftime("%Y-%m")
-            if month_key not in monthly:
-                monthly[month_key] = []
-            monthly[month_key].append(app.ats_score)
-
+    month = func.to_char(
+        func.timezone("UTC", JobApplication.created_at), "YYYY-MM"
+    ).label("month")
+    trend_result = await db.execute(
+        select(month, func.avg(JobApplication.ats_score), func.count())
+        .where(user_filter, JobApplication.ats_score > 0,
+               JobApplication.created_at.isnot(None))
+        .group_by(text("month"))
+        .order_by(text("month DESC"))
+        .limit(6)
+    )
     recent_trend = [
-        {"month": m, "avg_ats": round(sum(v) / len(v), 1), "count": len(v)}
-        for m, v in sorted(monthly.items())[-6:]
+        {"month": m, "avg_ats": round(float(a), 1), "count": c}
+        for m, a, c in reversed(trend_result.all())
     ]
 
     return AnalyticsSummary(
-        total_applications=len(apps),
+        total_applications=total,
         average_ats_score=avg_ats,
         highest_ats_score=high_ats,
         most_common_missing_skills=top_missing,
@@ -92,42 +116,61 @@ async def get_summary(
 @router.get("/ats-trend")
 async def ats_trend(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """Return ATS scores over time for chart rendering."""
-    apps = await _get_all_apps(db, current_user.id)
-    return [
+    rows = await _stream_trend_rows(db, current_user_id)
+    # Plain JSON types only, so hand straight to orjson and skip jsonable_encoder
+    return ORJSONResponse([
         {
             "id":         a.id,
             "job_title":  a.job_title or "Untitled",
             "company":    a.company or "",
             "ats_score":  a.ats_score or 0,
-            "grade":      (a.ats_breakdown or {}).get("grade", "—"),
+            "grade":      a.grade or "—",
             "created_at": a.created_at.isoformat() if a.created_at else "",
             "status":     a.status,
         }
-        for a in apps
-    ]
+        async for a in rows
+    ])
 
 
 @router.get("/skill-gaps")
 async def skill_gaps(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """Aggregate most frequent missing skills across all applications."""
-    apps = await _get_all_apps(db, current_user.id)
+    missing_lists = await _stream_missing_skill_lists(db, current_user_id)
     counter: Counter = Counter()
-    for app in apps:
-        for skill in (app.missing_skills or []):
-            counter[skill] += 1
+    async for batch in missing_lists.partitions(500):
+        counter.update(chain.from_iterable(m or () for m in batch))
     return [{"skill": k, "count": v} for k, v in counter.most_common(20)]
 
 
-async def _get_all_apps(db: AsyncSession, user_id: int) -> list:
-    result = await db.execute(
-        select(JobApplication)
+# Column-projected, server-side-cursor fetches: never pull the resume / cover
+# letter / JD TEXT blobs, and never materialise the full result set in Python.
+
+async def _stream_trend_rows(db: AsyncSession, user_id: int) -> AsyncResult:
+    return await db.stream(
+        select(
+            JobApplication.id,
+            JobApplication.job_title,
+            JobApplication.company,
+            JobApplication.ats_score,
+            JobApplication.ats_breakdown["grade"].as_string().label("grade"),
+            JobApplication.created_at,
+            JobApplication.status,
+        )
+        .where(JobApplication.user_id == user_id)
+        .order_by(JobApplication.created_at.desc())
+    )
+
+
+async def _stream_missing_skill_lists(db: AsyncSession, user_id: int) -> AsyncScalarResult:
+    result = await db.stream(
+        select(JobApplication.missing_skills)
         .where(JobApplication.user_id == user_id)
         .order_by(JobApplication.created_at.desc())
     )
-    return result.scalars().all()
+    return result.scalars()
@@ -3,7 +3,7 @@ Applications Router – AI-powered resume optimization + cover letter generation
 Full RAG pipeline: retrieve → augment → generate → score → store.
 
 POST /api/applications/optimize   – main endpoint (streaming SSE)
-GET  /api/applications            – list applications
+GET  /api/applications            – list applications (summary rows; ?full=true for all fields)
 GET  /api/applications/{id}       – get one
 PUT  /api/applications/{id}/status
 DELETE /api/applications/{id}
@@ -11,30 +11,44 @@ GET  /api/applications/{id}/download/resume/pdf
 GET  /api/applications/{id}/download/cover/pdf
 """
 
-import json
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import hashlib
+import logging
+import re
+from contextlib import aclosing
+from functools import lru_cache
+from urllib.parse import quote
+
+import anyio
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from database import get_db
-from auth import get_current_user
-from models import User, JobApplication, Resume, GitHubRepo, Skill
+from database import get_db, AsyncSessionLocal
+from auth import get_current_user_id
+from models import JobApplication, Resume, GitHubRepo, Skill
 from schemas import (
-    JobOptimizeRequest, JobApplicationResponse, ApplicationStatusUpdate,
+    JobOptimizeRequest, JobApplicationResponse, JobApplicationSummary,
+    ApplicationStatusUpdate,
 )
 from services.llm_service import (
     tailor_resume_stream, generate_cover_letter_stream,
     tailor_resume, generate_cover_letter,
-    review_resume, analyze_ats_llm,
+    review_and_analyze_ats,
 )
-from services.rag_service import retrieve_for_jd, compute_semantic_similarity
+from services.rag_service import (
+    cached_retrieve_for_jd, compute_semantic_similarity, embed_single,
+)
+from services import result_cache, semantic_cache
 from services.ats_service import compute_ats_score
-from services.pdf_generator import generate_pdf, generate_docx
+from services.pdf_generator import generate_pdf, generate_docx, render_in_pool
 from services.skill_extractor import get_skill_gap
 
 router = APIRouter(prefix="/api/applications", tags=["Applications"])
+logger = logging.getLogger("internai")
 
 
 # ── Main Optimization Endpoint (Streaming SSE) ────────────────────────────────
@@ -42,105 +56,147 @@ router = APIRouter(prefix="/api/applications", tags=["Applications"])
 @router.post("/optimize/stream")
 async def optimize_stream(
     payload: JobOptimizeRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """
     Full pipeline with Server-Sent Events streaming:
+    0. Insert the application row (status "generating"), send its id
     1. RAG retrieval
     2. Stream tailored resume tokens
     3. Stream cover letter tokens
-    4. Reviewer pass
-    5. ATS scoring
-    6. Persist to DB
+    4+5. Reviewer + ATS analysis (one fused LLM call) → ATS scoring (memoised)
+    6. Persist remaining fields, status → "draft" ("failed" on error)
     7. Stream final metadata (ATS score, app_id)
     """
-    resume = await _require_resume(db, current_user.id)
-    github_summary = await _build_github_summary(db, current_user.id)
-    user_skills = await _get_skill_names(db, current_user.id)
+    # JD embedding + RAG retrieval start now and overlap the DB loads, the
+    # placeholder insert and the cache lookup; awaited only where consumed.
+    embed_task, rag_task = _start_context_tasks(current_user_id, payload.job_description)
+    try:
+        resume, github_summary, user_skills = await _load_pipeline_inputs(current_user_id)
+    except BaseException:
+        rag_task.cancel()
+        raise
+
+    async def event_generator() -> AsyncGenerator[bytes, None]:
+        # Persist a placeholder row up-front: the client gets an id to deep-link
+        # or poll, and each artifact is written as soon as it is finished.
+        app = JobApplication(
+            user_id=current_user_id,
+            job_title=payload.job_title,
+            company=payload.company,
+            job_url=payload.job_url,
+            job_description=payload.job_description,
+            optimized_resume="",
+            cover_letter="",
+            status="generating",
+        )
+        db.add(app)
+        await db.commit()
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        # ── Step 1: RAG retrieval ──────────────────────────────────────────
-        yield _sse("status", "Retrieving relevant context from your profile...")
-        rag = retrieve_for_jd(current_user.id, payload.job_description)
+        try:
+            yield _sse("app_id", str(app.id))
+            async with aclosing(_run_pipeline(app)) as frames:
+                async for frame in frames:
+                    yield frame
+        except BaseException:
+            # Errors and client disconnects both leave a recoverable partial row.
+            # A disconnect arrives as CancelledError (Starlette cancels the
+            # response task group) or GeneratorExit (aclose); shield the update
+            # so the cancelled scope doesn't cancel the commit as well.
+            with anyio.CancelScope(shield=True):
+                app.status = "failed"
+                try:
+                    await db.commit()
+                except Exception:
+                    logger.exception("Could not mark application %s as failed", app.id)
+            raise
+        finally:
+            rag_task.cancel()
+
+    async def _run_pipeline(app: JobApplication) -> AsyncGenerator[bytes, None]:
+        jd_embedding = await embed_task
+        cached = _lookup_cached_outputs(current_user_id, resume, payload, jd_embedding)
+
+        if cached:
+            yield _sse("status", "⚡ Reusing your previous optimization for this job...")
+            resume_tokens = _replay(cached["tailored_resume"])
+        else:
+            # ── Step 1: RAG retrieval (already in flight) ──────────────────
+            yield _sse("status", "Retrieving relevant context from your profile...")
+            rag = await rag_task
+
+            yield _sse("status", "✍️ Tailoring resume with AI...")
+            resume_tokens = tailor_resume_stream(
+                original_resume=resume.raw_text,
+                job_description=payload.job_description,
+                rag_context=rag["context"],
+                github_summary=github_summary,
+            )
 
         # ── Step 2: Stream tailored resume ────────────────────────────────
-        yield _sse("status", "✍️ Tailoring resume with AI...")
-        tailored_resume = ""
-        async for token in tailor_resume_stream(
-            original_resume=resume.raw_text,
-            job_description=payload.job_description,
-            rag_context=rag["context"],
-            github_summary=github_summary,
-        ):
-            tailored_resume += token
-            yield _sse("resume_token", token)
+        resume_parts: list[str] = []
+        async for chunk in _batched(resume_tokens):
+            resume_parts.append(chunk)
+            yield _sse_token(_RESUME_TOKEN_FRAME, chunk)
+        tailored_resume = "".join(resume_parts)
 
+        app.optimized_resume = tailored_resume
+        await db.commit()
         yield _sse("resume_done", "")
 
         # ── Step 3: Stream cover letter ───────────────────────────────────
         yield _sse("status", "✉️ Writing cover letter...")
-        cover_letter = ""
-        async for token in generate_cover_letter_stream(
+        cover_tokens = _replay(cached["cover_letter"]) if cached else generate_cover_letter_stream(
             tailored_resume=tailored_resume,
             job_description=payload.job_description,
             job_title=payload.job_title or "",
             company=payload.company or "",
-            github_highlights=github_summary[:500] if github_summary else "",
-        ):
-            cover_letter += token
-            yield _sse("cover_token", token)
+            github_summary=github_summary,
+        )
+        cover_parts: list[str] = []
+        async for chunk in _batched(cover_tokens):
+            cover_parts.append(chunk)
+            yield _sse_token(_COVER_TOKEN_FRAME, chunk)
+        cover_letter = "".join(cover_parts)
 
+        app.cover_letter = cover_letter
+        await db.commit()
         yield _sse("cover_done", "")
 
-        # ── Step 4: Reviewer pass ─────────────────────────────────────────
-        yield _sse("status", "🔍 Running reviewer analysis...")
-        reviewer_feedback = await review_resume(tailored_resume, payload.job_description)
-        yield _sse("reviewer_done", reviewer_feedback[:500])
-
-        # ── Step 5: ATS Scoring ───────────────────────────────────────────
-        yield _sse("status", "📊 Computing ATS score...")
-        semantic_sim = compute_semantic_similarity(tailored_resume, payload.job_description)
-        llm_analysis  = await analyze_ats_llm(tailored_resume, payload.job_description)
-        ats_result     = compute_ats_score(
-            resume_text=tailored_resume,
-            job_description=payload.job_description,
-            user_skills=user_skills,
-            semantic_similarity=semantic_sim,
-            llm_analysis=llm_analysis,
+        # ── Step 4+5: Reviewer pass + ATS analysis (one fused LLM call) ──────
+        yield _sse("status", "🔍 Running reviewer analysis and ATS scoring...")
+        reviewer_feedback, ats_result, llm_analysis = await _review_and_score(
+            current_user_id, tailored_resume, payload.job_description,
+            user_skills, jd_embedding, cached,
         )
+        yield _sse("reviewer_done", reviewer_feedback[:500])
 
-        # ── Step 6: Persist ───────────────────────────────────────────────
+        # ── Step 6: Persist remaining fields ──────────────────────────────
         yield _sse("status", "💾 Saving application...")
-        app = JobApplication(
-            user_id=current_user.id,
-            job_title=payload.job_title,
-            company=payload.company,
-            job_url=payload.job_url,
-            job_description=payload.job_description,
-            optimized_resume=tailored_resume,
-            cover_letter=cover_letter,
-            reviewer_feedback=reviewer_feedback,
-            ats_score=ats_result["total_score"],
-            ats_breakdown=ats_result,
-            missing_skills=ats_result.get("missing_skills", []),
-            matched_keywords=ats_result.get("matched_keywords", []),
-        )
-        db.add(app)
+        app.reviewer_feedback = reviewer_feedback
+        app.ats_score         = ats_result["total_score"]
+        app.ats_breakdown     = ats_result
+        app.missing_skills    = ats_result.get("missing_skills", [])
+        app.matched_keywords  = ats_result.get("matched_keywords", [])
+        app.status            = "draft"
         await db.commit()
-        await db.refresh(app)
+        if not cached:
+            _store_cached_outputs(current_user_id, resume, payload, jd_embedding,
+                                  tailored_resume, cover_letter, reviewer_feedback, llm_analysis)
 
         # ── Step 7: Final metadata ────────────────────────────────────────
-        yield _sse("done", json.dumps({
+        yield _sse("done", orjson.dumps({
             "app_id":       app.id,
             "ats_score":    ats_result["total_score"],
             "grade":        ats_result["grade"],
             "verdict":      ats_result["verdict"],
             "ats_breakdown": ats_result,
-        }))
+        }).decode())
 
     return StreamingResponse(
-        event_generator(),
+        _until_disconnected(request, event_generator()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -149,53 +205,54 @@ async def optimize_stream(
     )
 
 
-@router.post("/optimize", response_model=JobApplicationResponse)
+@router.post("/optimize", response_model=JobApplicationResponse, response_model_exclude_none=True)
 async def optimize(
     payload: JobOptimizeRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """
     Non-streaming optimization endpoint.
     Runs full pipeline and returns complete application object.
     """
-    resume = await _require_resume(db, current_user.id)
-    github_summary = await _build_github_summary(db, current_user.id)
-    user_skills = await _get_skill_names(db, current_user.id)
-
-    # RAG retrieval
-    rag = retrieve_for_jd(current_user.id, payload.job_description)
-
-    # Generate resume + cover letter
-    tailored = await tailor_resume(
-        original_resume=resume.raw_text,
-        job_description=payload.job_description,
-        rag_context=rag["context"],
-        github_summary=github_summary,
-    )
-    cover = await generate_cover_letter(
-        tailored_resume=tailored,
-        job_description=payload.job_description,
-        job_title=payload.job_title or "",
-        company=payload.company or "",
-        github_highlights=github_summary[:500] if github_summary else "",
-    )
-    reviewer = await review_resume(tailored, payload.job_description)
+    embed_task, rag_task = _start_context_tasks(current_user_id, payload.job_description)
+    try:
+        resume, github_summary, user_skills = await _load_pipeline_inputs(current_user_id)
+        jd_embedding = await embed_task
+        cached = _lookup_cached_outputs(current_user_id, resume, payload, jd_embedding)
+        # RAG retrieval (started alongside the input loads)
+        rag = None if cached else await rag_task
+    finally:
+        rag_task.cancel()
+
+    if cached:
+        tailored = cached["tailored_resume"]
+        cover    = cached["cover_letter"]
+    else:
+        # Generate resume + cover letter
+        tailored = await tailor_resume(
+            original_resume=resume.raw_text,
+            job_description=payload.job_description,
+            rag_context=rag["context"],
+            github_summary=github_summary,
+        )
+        cover = await generate_cover_letter(
+            tailored_resume=tailored,
+            job_description=payload.job_description,
+            job_title=payload.job_title or "",
+            company=payload.company or "",
+            github_summary=github_summary,
+        )
 
-    # ATS score
-    semantic_sim = compute_semantic_similarity(tailored, payload.job_description)
-    llm_analysis  = await analyze_ats_llm(tailored, payload.job_description)
-    ats_result     = compute_ats_score(
-        resume_text=tailored,
-        job_description=payload.job_description,
-        user_skills=user_skills,
-        semantic_similarity=semantic_sim,
-        llm_analysis=llm_analysis,
+    # Reviewer + ATS analysis (one fused LLM call), then ATS score
+    reviewer, ats_result, llm_analysis = await _review_and_score(
+        current_user_id, tailored, payload.job_description,
+        user_skills, jd_embedding, cached,
     )
 
     # Persist
     app = JobApplication(
-        user_id=current_user.id,
+        user_id=current_user_id,
         job_title=payload.job_title,
         company=payload.company,
         job_url=payload.job_url,
@@ -211,34 +268,59 @@ async def optimize(
     db.add(app)
     await db.commit()
     await db.refresh(app)
+    if not cached:
+        _store_cached_outputs(current_user_id, resume, payload, jd_embedding,
+                              tailored, cover, reviewer, llm_analysis)
     return app
 
 
 # ── CRUD ──────────────────────────────────────────────────────────────────────
 
-@router.get("", response_model=list[JobApplicationResponse])
+@router.get("")
 async def list_applications(
     limit: int = 50,
     offset: int = 0,
+    full: bool = False,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+    current_user_id: int = Depends(get_current_user_id),
+) -> list[JobApplicationSummary] | list[JobApplicationResponse]:
+    """
+    Summary rows by default (served from ix_jobapp_user_created, no TEXT blobs).
+    Pass full=true for complete applications, e.g. the history view.
+    """
+    if full:
+        result = await db.execute(
+            select(JobApplication)
+            .where(JobApplication.user_id == current_user_id)
+            .order_by(JobApplication.created_at.desc())
+            .limit(limit).offset(offset)
+        )
+        return [JobApplicationResponse.model_validate(a) for a in result.scalars()]
+
     result = await db.execute(
-        select(JobApplication)
-        .where(JobApplication.user_id == current_user.id)
+        select(
+            JobApplication.id,
+            JobApplication.job_title,
+            JobApplication.company,
+            JobApplication.ats_score,
+            JobApplication.ats_breakdown["grade"].as_string().label("grade"),
+            JobApplication.status,
+            JobApplication.created_at,
+        )
+        .where(JobApplication.user_id == current_user_id)
         .order_by(JobApplication.created_at.desc())
         .limit(limit).offset(offset)
     )
-    return result.scalars().all()
+    return [JobApplicationSummary(**row._mapping) for row in result]
 
 
-@router.get("/{app_id}", response_model=JobApplicationResponse)
+@router.get("/{app_id}", response_model=JobApplicationResponse, response_model_exclude_none=True)
 async def get_application(
     app_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
+    app = await _require_app(db, app_id, current_user_id)
     return app
 
 
@@ -247,9 +329,9 @@ async def update_status(
     app_id: int,
     payload: ApplicationStatusUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
+    app = await _require_app(db, app_id, current_user_id)
     valid_statuses = {"draft", "applied", "interview", "rejected", "offer"}
     if payload.status not in valid_statuses:
         raise HTTPException(400, f"Status must be one of: {valid_statuses}")
@@ -265,9 +347,9 @@ async def update_status(
 async def delete_application(
     app_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
+    app = await _require_app(db, app_id, current_user_id)
     await db.delete(app)
     await db.commit()
     return {"message": "Deleted"}
@@ -278,61 +360,101 @@ async def delete_application(
 @router.get("/{app_id}/download/resume/pdf")
 async def download_resume_pdf(
     app_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
-    pdf = generate_pdf(app.optimized_resume, f"Resume – {app.job_title or 'Position'}")
-    fname = f"resume_{(app.job_title or 'position').replace(' ','_')}.pdf"
-    return Response(content=pdf, media_type="application/pdf",
-                    headers={"Content-Disposition": f"attachment; filename={fname}"})
+    app = await _require_app(db, app_id, current_user_id)
+    return await _document_response(
+        request, "pdf", app.optimized_resume,
+        f"Resume – {app.job_title or 'Position'}",
+        _content_disposition("resume", app.job_title, "pdf"),
+    )
 
 
 @router.get("/{app_id}/download/resume/docx")
 async def download_resume_docx(
     app_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
-    docx = generate_docx(app.optimized_resume)
-    fname = f"resume_{(app.job_title or 'position').replace(' ','_')}.docx"
-    return Response(
-        content=docx,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename={fname}"},
+    app = await _require_app(db, app_id, current_user_id)
+    return await _document_response(
+        request, "docx", app.optimized_resume,
+        "Resume", _content_disposition("resume", app.job_title, "docx"),
     )
 
 
 @router.get("/{app_id}/download/cover/pdf")
 async def download_cover_pdf(
     app_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
-    pdf = generate_pdf(app.cover_letter, f"Cover Letter – {app.job_title or 'Position'}")
-    fname = f"cover_letter_{(app.job_title or 'position').replace(' ','_')}.pdf"
-    return Response(content=pdf, media_type="application/pdf",
-                    headers={"Content-Disposition": f"attachment; filename={fname}"})
+    app = await _require_app(db, app_id, current_user_id)
+    return await _document_response(
+        request, "pdf", app.cover_letter,
+        f"Cover Letter – {app.job_title or 'Position'}",
+        _content_disposition("cover_letter", app.job_title, "pdf"),
+    )
 
 
 @router.get("/{app_id}/download/cover/docx")
 async def download_cover_docx(
     app_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    app = await _require_app(db, app_id, current_user.id)
-    docx = generate_docx(app.cover_letter)
-    fname = f"cover_letter_{(app.job_title or 'position').replace(' ','_')}.docx"
-    return Response(
-        content=docx,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename={fname}"},
+    app = await _require_app(db, app_id, current_user_id)
+    return await _document_response(
+        request, "docx", app.cover_letter,
+        "Resume", _content_disposition("cover_letter", app.job_title, "docx"),
     )
 
 
+PDF_MEDIA_TYPE  = "application/pdf"
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_DOC_MEDIA_TYPES = {"pdf": PDF_MEDIA_TYPE, "docx": DOCX_MEDIA_TYPE}
+
+
+@lru_cache(maxsize=1024)
+def _content_disposition(stem: str, job_title: Optional[str], ext: str) -> str:
+    """
+    RFC 6266/5987 attachment header: an ASCII-only filename= fallback plus the
+    UTF-8 filename*= form, so non-ASCII job titles can't break header encoding.
+    Memoised – the same title is downloaded in several formats, repeatedly.
+    """
+    title = (job_title or "position").replace(" ", "_")
+    ascii_name = f"{stem}_{_UNSAFE_FILENAME_CHARS.sub('', title) or 'position'}.{ext}"
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(f'{stem}_{title}.{ext}')}"
+
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+async def _document_response(
+    request: Request, fmt: str, text: str, title: str, content_disposition: str,
+) -> Response:
+    """
+    Render text as PDF/DOCX in the process pool (CPU-bound, keeps the event loop free).
+    The ETag is a digest of the rendering inputs, so an unchanged document is a 304.
+    """
+    digest = hashlib.blake2b(f"{fmt}\x00{title}\x00{text}".encode("utf-8"), digest_size=16)
+    headers = {"ETag": f'"{digest.hexdigest()}"', "Cache-Control": "private, max-age=3600"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    if fmt == "pdf":
+        content = await render_in_pool(generate_pdf, text, title)
+    else:
+        content = await render_in_pool(generate_docx, text, title)
+    headers["Content-Disposition"] = content_disposition
+    return Response(content=content, media_type=_DOC_MEDIA_TYPES[fmt], headers=headers)
+
+
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
 async def _require_resume(db, user_id: int):
@@ -356,12 +478,15 @@ async def _require_app(db, app_id: int, user_id: int):
     return app
 
 
-async def _build_github_summary(db, user_id: int) -> str:
+async def _fetch_github_repos(db, user_id: int) -> list:
     result = await db.execute(
         select(GitHubRepo).where(GitHubRepo.user_id == user_id)
         .order_by(GitHubRepo.stars.desc()).limit(10)
     )
-    repos = result.scalars().all()
+    return result.scalars().all()
+
+
+def _format_github_summary(repos: list) -> str:
     if not repos:
         return ""
     lines = []
@@ -374,10 +499,209 @@ async def _build_github_summary(db, user_id: int) -> str:
     return "\n".join(lines)
 
 
+async def _in_own_session(query_fn, *args):
+    # An AsyncSession can't run statements concurrently, so each gathered
+    # query gets its own short-lived session from the pool.
+    async with AsyncSessionLocal() as session:
+        return await query_fn(session, *args)
+
+
+async def _load_pipeline_inputs(user_id: int) -> tuple:
+    """Resume, GitHub summary and skill names in parallel: one RTT instead of three."""
+    resume, repos, user_skills = await asyncio.gather(
+        _in_own_session(_require_resume, user_id),
+        _in_own_session(_fetch_github_repos, user_id),
+        _in_own_session(_get_skill_names, user_id),
+    )
+    return resume, _format_github_summary(repos), user_skills
+
+
+def _job_meta(payload: JobOptimizeRequest) -> str:
+    return f"{payload.job_title or ''}|{payload.company or ''}"
+
+
+def _start_context_tasks(user_id: int, job_description: str) -> tuple[asyncio.Task, asyncio.Task]:
+    """
+    Embed the JD once per request (reused for the semantic cache lookup, RAG
+    retrieval and semantic similarity) and chain RAG retrieval onto it.
+    Returns (embedding task, retrieval task); cancel the latter if unused.
+    """
+    embed_task = asyncio.create_task(
+        asyncio.to_thread(embed_single, job_description[:3000])
+    )
+
+    async def retrieve() -> dict:
+        return await asyncio.to_thread(
+            cached_retrieve_for_jd, user_id, job_description, await asyncio.shield(embed_task),
+        )
+
+    return embed_task, asyncio.create_task(retrieve())
+
+
+def _lookup_cached_outputs(user_id: int, resume, payload: JobOptimizeRequest,
+                           jd_embedding) -> Optional[dict]:
+    return semantic_cache.get(user_id, resume.raw_text, payload.job_description,
+                              _job_meta(payload), jd_embedding=jd_embedding)
+
+
+def _store_cached_outputs(user_id: int, resume, payload: JobOptimizeRequest, jd_embedding,
+                          tailored: str, cover: str, reviewer: str, llm_analysis: dict) -> None:
+    semantic_cache.put(
+        user_id, resume.raw_text, payload.job_description,
+        {
+            "tailored_resume":   tailored,
+            "cover_letter":      cover,
+            "reviewer_feedback": reviewer,
+            "llm_analysis":      llm_analysis,
+        },
+        _job_meta(payload),
+        jd_embedding=jd_embedding,
+    )
+
+
+# A word plus its trailing whitespace (or a leading whitespace run): joining the
+# matches reproduces the text exactly
+_REPLAY_RE = re.compile(r"\S+\s*|\s+")
+
+
+async def _replay(text: str, words_per_chunk: int = 20) -> AsyncGenerator[str, None]:
+    """Re-emit cached text in small slices so cache hits stream like live tokens."""
+    words = _REPLAY_RE.findall(text)
+    for i in range(0, len(words), words_per_chunk):
+        yield "".join(words[i : i + words_per_chunk])
+        await asyncio.sleep(0)
+
+
+async def _until_disconnected(
+    request: Request,
+    frames: AsyncGenerator[bytes, None],
+) -> AsyncGenerator[bytes, None]:
+    """
+    Stop the pipeline as soon as the client goes away. Usually Starlette's own
+    disconnect listener gets there first: it cancels the response task group,
+    and the CancelledError unwinds the pipeline from whatever it is awaiting.
+    The is_disconnected() check between frames covers the remaining case where
+    the disconnect is only seen here; closing the generator then raises
+    GeneratorExit inside it. Either way _batched and the httpx stream to Ollama
+    are unwound, and event_generator marks the partial row "failed".
+    Frames are pulled one at a time (no read-ahead), so a slow client
+    back-pressures the LLM stream rather than growing a buffer.
+    """
+    sent = 0
+    try:
+        async for frame in frames:
+            if await request.is_disconnected():
+                logger.info("SSE client disconnected after %d frames; cancelling generation", sent)
+                break
+            yield frame
+            sent += 1
+    finally:
+        await frames.aclose()
+
+
+async def _batched(
+    tokens: AsyncGenerator[str, None],
+    max_tokens: int = 32,
+    max_ms: float = 20,
+) -> AsyncGenerator[str, None]:
+    """
+    Coalesce a token stream into chunks of at most max_tokens, flushing early
+    once the oldest buffered token is max_ms old. One SSE frame per chunk
+    instead of per token, with no perceptible added latency.
+    """
+    loop = asyncio.get_running_loop()
+    it = tokens.__aiter__()
+    buf: list[str] = []
+    deadline = 0.0
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(it.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buf else None
+            # asyncio.wait (not wait_for) so a flush never cancels the upstream read
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield "".join(buf)
+                buf.clear()
+                continue
+            fut, pending = pending, None
+            try:
+                token = fut.result()
+            except StopAsyncIteration:
+                break
+            if not buf:
+                deadline = loop.time() + max_ms / 1000
+            buf.append(token)
+            if len(buf) >= max_tokens:
+                yield "".join(buf)
+                buf.clear()
+        if buf:
+            yield "".join(buf)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def _review_and_score(
+    user_id: int,
+    tailored_resume: str,
+    job_description: str,
+    user_skills: list[str],
+    jd_embedding,
+    cached: Optional[dict] = None,
+) -> tuple[str, dict, dict]:
+    """
+    Reviewer critique + ATS analysis come from one fused LLM call while the
+    embedding similarity runs alongside; then the ATS score is computed.
+    Memoised on (resume, JD, skills), so an unchanged re-submission skips all
+    of it. Semantic-cache hits supply the critique and analysis.
+    Returns (reviewer_feedback, ats_result, llm_analysis).
+    """
+    async def analyze() -> tuple[str, dict]:
+        if cached:
+            return cached["reviewer_feedback"], cached["llm_analysis"]
+        return await review_and_analyze_ats(tailored_resume, job_description)
+
+    async def compute() -> tuple[str, dict, dict]:
+        (reviewer, llm_analysis), semantic_sim = await asyncio.gather(
+            analyze(),
+            _semantic_similarity(tailored_resume, job_description, jd_embedding),
+        )
+        ats_result = compute_ats_score(
+            resume_text=tailored_resume,
+            job_description=job_description,
+            user_skills=user_skills,
+            semantic_similarity=semantic_sim,
+            llm_analysis=llm_analysis,
+        )
+        return reviewer, ats_result, llm_analysis
+
+    key = result_cache.make_key(
+        "review_ats", user_id, tailored_resume, job_description, *sorted(user_skills),
+    )
+    return await result_cache.get_or_compute(key, compute)
+
+
+async def _semantic_similarity(tailored_resume: str, job_description: str, jd_embedding) -> float:
+    return await asyncio.to_thread(
+        compute_semantic_similarity, tailored_resume, job_description, None, jd_embedding,
+    )
+
+
 async def _get_skill_names(db, user_id: int) -> list[str]:
     result = await db.execute(select(Skill.name).where(Skill.user_id == user_id))
-    return [row[0] for row in result.fetchall()]
+    return list(result.scalars().all())
+
+
+def _sse(event_type: str, data: str) -> bytes:
+    return b"data: " + orjson.dumps({"type": event_type, "content": data}) + b"\n\n"
+
+
+# Token frames are the hot path: prebuilt prefix + JSON-escaped content only
+_RESUME_TOKEN_FRAME = b'data: {"type":"resume_token","content":'
+_COVER_TOKEN_FRAME  = b'data: {"type":"cover_token","content":'
 
 
-def _sse(event_type: str, data: str) -> str:
-    return f"data: {json.dumps({'type': event_type, 'content': data})}\n\n"
+def _sse_token(frame_prefix: bytes, content: str) -> bytes:
+    return frame_prefix + orjson.dumps(content) + b"}\n\n"
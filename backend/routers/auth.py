@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from auth import (
     authenticate_user, create_user, create_access_token,
-    get_current_user, get_user_by_email,
+    get_current_user, get_user_by_email, invalidate_user_cache,
 )
 from schemas import UserRegister, TokenResponse, UserResponse
 from models import User
@@ -73,4 +73,5 @@ async def update_me(
     db.add(current_user)
     await db.flush()
     await db.refresh(current_user)
+    invalidate_user_cache(current_user.id)
     return current_user
@@ -2,58 +2,90 @@
 Profile Router – resume upload, LinkedIn input, GitHub fetch, skill inventory.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, insert, delete, func, update, case, cast, literal_column, JSON
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import selectinload
+import asyncio
+import hashlib
 import json
+import logging
 
-from database import get_db
-from auth import get_current_user
-from models import User, Resume, LinkedInProfile, GitHubRepo, Skill
+from cachetools import TTLCache
+
+from database import get_db, AsyncSessionLocal
+from auth import get_current_user, get_current_user_id, invalidate_user_cache
+from models import User, Resume, LinkedInProfile, GitHubRepo, Skill, JobApplication
 from schemas import (
     ResumeResponse, LinkedInInput, LinkedInResponse,
     GitHubFetchRequest, GitHubRepoResponse, SkillResponse, ProfileResponse,
 )
 from services.resume_parser import extract_text, validate, parse_sections
+from services.pdf_generator import generate_pdf, render_in_pool
 from services.github_service import fetch_github_profile
 from services.skill_extractor import (
     extract_skills_from_text, merge_skills, rank_skills,
 )
-from services.rag_service import index_resume, index_linkedin, index_github_repos
+from services.rag_service import (
+    index_resume, index_linkedin, index_github_repos, invalidate_retrieval_cache,
+)
 from services.llm_service import extract_contact_info, extract_skills_llm
+from services import result_cache, semantic_cache
 
 router = APIRouter(prefix="/api/profile", tags=["Profile"])
+logger = logging.getLogger("internai")
+
+_MAX_RESUME_BYTES = 5 * 1024 * 1024
+_UPLOAD_CHUNK     = 64 * 1024
+
+# (content hash, extension) → (extracted text, parsed sections)
+_PARSED_RESUME_CACHE: TTLCache = TTLCache(maxsize=128, ttl=3600)
+
+# Whole-profile GitHub fetches (user + repos + READMEs ≈ 7 API calls), keyed by
+# the normalised URL/username: a re-submit or refresh within the TTL reuses
+# the last result instead of spending the 60/hr unauthenticated quota.
+_GITHUB_PROFILE_CACHE: TTLCache = TTLCache(maxsize=256, ttl=300)
 
 
 # ── Full Profile ──────────────────────────────────────────────────────────────
 
-@router.get("", response_model=ProfileResponse)
+@router.get("", response_model=ProfileResponse, response_model_exclude_none=True)
 async def get_profile(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """Get complete user profile: resume + LinkedIn + GitHub + skills."""
-    resume = await _get_resume(db, current_user.id)
-    linkedin = await _get_linkedin(db, current_user.id)
-    repos = await _get_repos(db, current_user.id)
-    skills = await _get_skills(db, current_user.id)
-
-    from schemas import UserResponse
-    from sqlalchemy import func, select
-    from models import JobApplication
-    app_count_result = await db.execute(
-        select(func.count()).where(JobApplication.user_id == current_user.id)
+    # User row + application count in one SELECT; each relationship is then
+    # batch-loaded by selectinload instead of a hand-written fetch per section
+    app_count = (
+        select(func.count())
+        .where(JobApplication.user_id == current_user_id)
+        .scalar_subquery()
     )
-    app_count = app_count_result.scalar() or 0
+    result = await db.execute(
+        select(User, app_count)
+        .where(User.id == current_user_id)
+        .options(
+            selectinload(User.resume),
+            selectinload(User.linkedin_profile),
+            selectinload(User.github_repos),
+            selectinload(User.skills),
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    user, total_applications = row
 
     return ProfileResponse(
-        user=current_user,
-        resume=resume,
-        linkedin=linkedin,
-        github_repos=repos,
-        skills=skills,
-        total_applications=app_count,
+        user=user,
+        resume=user.resume,
+        linkedin=user.linkedin_profile,
+        github_repos=user.github_repos,
+        skills=user.skills,
+        total_applications=total_applications or 0,
     )
 
 
@@ -61,43 +93,61 @@ async def get_profile(
 
 @router.post("/resume", response_model=ResumeResponse)
 async def upload_resume(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Upload PDF/DOCX/TXT resume. Parses, validates, indexes into ChromaDB."""
+    """Upload PDF/DOCX/TXT resume. Parses, validates; ChromaDB indexing runs in the background."""
     allowed = {".pdf", ".docx", ".doc", ".txt"}
     import os
     ext = os.path.splitext(file.filename)[1].lower()
     if ext not in allowed:
         raise HTTPException(400, f"Unsupported file type: {ext}")
 
-    raw_bytes = await file.read()
-    if len(raw_bytes) > 5 * 1024 * 1024:  # 5 MB limit
-        raise HTTPException(400, "File too large (max 5 MB)")
+    # Read in chunks: reject oversize uploads as soon as they cross the limit,
+    # and hash as we go so an unchanged re-upload can skip the whole pipeline
+    buf = bytearray()
+    digest = hashlib.blake2b(digest_size=16)
+    while chunk := await file.read(_UPLOAD_CHUNK):
+        buf.extend(chunk)
+        if len(buf) > _MAX_RESUME_BYTES:
+            raise HTTPException(400, "File too large (max 5 MB)")
+        digest.update(chunk)
+    raw_bytes = bytes(buf)
+    content_hash = digest.hexdigest()
 
-    try:
-        text = extract_text(raw_bytes, file.filename)
-    except (ValueError, Exception) as exc:
-        raise HTTPException(422, str(exc))
-    valid, err = validate(text)
-    if not valid:
-        raise HTTPException(422, err)
-
-    # Parse sections
-    sections = parse_sections(text)
+    existing = await _get_resume(db, current_user.id)
+    if existing and existing.content_hash == content_hash:
+        # Same file as last time – text, sections, index and skills are current
+        existing.file_name = file.filename
+        return existing
+
+    # Re-uploading an earlier file (or any file parsed recently) reuses its parse
+    parse_key = (content_hash, ext)
+    parsed = _PARSED_RESUME_CACHE.get(parse_key)
+    if parsed is None:
+        try:
+            text = await asyncio.to_thread(extract_text, raw_bytes, file.filename)
+        except (ValueError, Exception) as exc:
+            raise HTTPException(422, str(exc))
+        valid, err = validate(text)
+        if not valid:
+            raise HTTPException(422, err)
+
+        # Parse sections
+        sections = await asyncio.to_thread(parse_sections, text)
+        _PARSED_RESUME_CACHE[parse_key] = (text, sections)
+    else:
+        text, sections = parsed
 
     # Upsert resume record
-    existing = await _get_resume(db, current_user.id)
     if existing:
-        # Update existing
-        result = await db.execute(
-            select(Resume).where(Resume.user_id == current_user.id)
-        )
-        resume_obj = result.scalar_one()
+        resume_obj = existing
         resume_obj.raw_text = text
         resume_obj.file_name = file.filename
         resume_obj.parsed_sections = sections
+        resume_obj.content_hash = content_hash
         resume_obj.chroma_indexed = 0
     else:
         resume_obj = Resume(
@@ -105,19 +155,18 @@ async def upload_resume(
             raw_text=text,
             file_name=file.filename,
             parsed_sections=sections,
+            content_hash=content_hash,
         )
         db.add(resume_obj)
 
     await db.flush()
-
-    # Index in ChromaDB
-    n_chunks = index_resume(current_user.id, text)
-    resume_obj.chroma_indexed = 1
-    await db.flush()
     await db.refresh(resume_obj)
 
+    # Index in ChromaDB after the response (chroma_indexed flips to 1 when done)
+    background_tasks.add_task(_index_in_background, index_resume, Resume, current_user.id, text)
+
     # Auto-extract and save skills from resume
-    skills = extract_skills_from_text(text, source="resume")
+    skills = await asyncio.to_thread(extract_skills_from_text, text, source="resume")
     await _upsert_skills(db, current_user.id, skills)
 
     return resume_obj
@@ -140,11 +189,10 @@ async def download_resume_pdf(
     current_user: User = Depends(get_current_user),
 ):
     """Download stored resume as ATS-clean PDF."""
-    from services.pdf_generator import generate_pdf
     resume = await _get_resume(db, current_user.id)
     if not resume:
         raise HTTPException(404, "No resume found")
-    pdf_bytes = generate_pdf(resume.raw_text, "Resume")
+    pdf_bytes = await render_in_pool(generate_pdf, resume.raw_text, "Resume")
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
@@ -157,10 +205,11 @@ async def download_resume_pdf(
 @router.post("/linkedin", response_model=LinkedInResponse)
 async def save_linkedin(
     payload: LinkedInInput,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Save LinkedIn profile data. Parses and indexes into ChromaDB."""
+    """Save LinkedIn profile data. Parses it; ChromaDB indexing runs in the background."""
     # Parse skills list
     skills_list: list[str] = []
     if payload.skills_text:
@@ -191,17 +240,15 @@ async def save_linkedin(
         db.add(li)
 
     await db.flush()
+    await db.refresh(li)
 
-    # Index in ChromaDB
-    index_linkedin(
-        current_user.id,
+    # Index in ChromaDB after the response
+    background_tasks.add_task(
+        _index_in_background, index_linkedin, LinkedInProfile, current_user.id,
         about=payload.about or "",
         experiences_text=payload.experiences_text or "",
         skills_text=payload.skills_text or "",
     )
-    li.chroma_indexed = 1
-    await db.flush()
-    await db.refresh(li)
 
     # Save skills
     skill_items = [{"name": s, "category": "Other", "source": "linkedin"}
@@ -227,12 +274,23 @@ async def get_linkedin(
 @router.post("/github", response_model=list[GitHubRepoResponse])
 async def fetch_and_save_github(
     payload: GitHubFetchRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Fetch GitHub profile, store repos, index in ChromaDB."""
+    """Fetch GitHub profile, store repos; ChromaDB indexing runs in the background."""
+    return await _fetch_and_save_github(payload.github_url, background_tasks, db, current_user)
+
+
+async def _fetch_and_save_github(
+    github_url: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession,
+    current_user: User,
+    force: bool = False,
+) -> list[GitHubRepo]:
     try:
-        data = await fetch_github_profile(payload.github_url)
+        data = await _fetch_github_cached(github_url, force=force)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
@@ -241,44 +299,41 @@ async def fetch_and_save_github(
     # Update user's GitHub URL
     current_user.github_url = data["profile_url"]
     db.add(current_user)
+    invalidate_user_cache(current_user.id)
 
     # Delete old repos
     await db.execute(delete(GitHubRepo).where(GitHubRepo.user_id == current_user.id))
 
-    # Insert new repos
+    # Insert new repos – one executemany INSERT ... RETURNING for the whole batch
     repo_objects = []
-    for repo in data["repos"]:
-        repo_obj = GitHubRepo(
-            user_id=current_user.id,
-            repo_name=repo["repo_name"],
-            description=repo.get("description", ""),
-            language=repo.get("language", ""),
-            languages_json=repo.get("languages_json", {}),
-            stars=repo.get("stars", 0),
-            topics=repo.get("topics", []),
-            readme_text=repo.get("readme_text"),
-            html_url=repo.get("html_url", ""),
-            pushed_at=repo.get("pushed_at", ""),
+    if data["repos"]:
+        result = await db.execute(
+            insert(GitHubRepo).returning(GitHubRepo, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id":        current_user.id,
+                    "repo_name":      repo["repo_name"],
+                    "description":    repo.get("description", ""),
+                    "language":       repo.get("language", ""),
+                    "languages_json": repo.get("languages_json", {}),
+                    "stars":          repo.get("stars", 0),
+                    "topics":         repo.get("topics", []),
+                    "readme_text":    repo.get("readme_text"),
+                    "html_url":       repo.get("html_url", ""),
+                    "pushed_at":      repo.get("pushed_at", ""),
+                }
+                for repo in data["repos"]
+            ],
         )
-        db.add(repo_obj)
-        repo_objects.append(repo_obj)
-
-    await db.flush()
-
-    # Index in ChromaDB
-    index_github_repos(current_user.id, data["repos"])
-    for r in repo_objects:
-        r.chroma_indexed = 1
+        repo_objects = result.scalars().all()
 
-    await db.flush()
-
-    # Extract skills from GitHub
-    all_text = " ".join(
-        f"{r['repo_name']} {r.get('description','')} {r.get('language','')} "
-        f"{' '.join(r.get('topics', []))} {r.get('readme_text','')or ''}"
-        for r in data["repos"]
+    # Index in ChromaDB after the response
+    background_tasks.add_task(
+        _index_in_background, index_github_repos, GitHubRepo, current_user.id, data["repos"],
     )
-    skills = extract_skills_from_text(all_text, source="github")
+
+    # Extract skills from GitHub (off the event loop – READMEs can be large)
+    skills = await asyncio.to_thread(_extract_github_skills, data["repos"])
     await _upsert_skills(db, current_user.id, skills)
 
     return repo_objects
@@ -294,15 +349,15 @@ async def get_github_repos(
 
 @router.post("/github/refresh", response_model=list[GitHubRepoResponse])
 async def refresh_github(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Re-fetch GitHub repos (rate-limit: use sparingly)."""
+    """Re-fetch GitHub repos, bypassing response caches (ETag revalidation still applies)."""
     if not current_user.github_url:
         raise HTTPException(400, "No GitHub URL set. Add it first.")
-    from schemas import GitHubFetchRequest
-    return await fetch_and_save_github(
-        GitHubFetchRequest(github_url=current_user.github_url), db, current_user
+    return await _fetch_and_save_github(
+        current_user.github_url, background_tasks, db, current_user, force=True,
     )
 
 
@@ -318,6 +373,53 @@ async def get_skills(
 
 # ── Internal Helpers ──────────────────────────────────────────────────────────
 
+def _extract_github_skills(repos: list[dict]) -> list[dict]:
+    """Extract skills repo by repo and merge, instead of scanning one concatenated blob."""
+    per_repo = [
+        extract_skills_from_text(
+            f"{r['repo_name']} {r.get('description','')} {r.get('language','')} "
+            f"{' '.join(r.get('topics', []))} {r.get('readme_text','')or ''}",
+            source="github",
+        )
+        for r in repos
+    ]
+    # One entry per skill, as the single-blob scan produced
+    return [
+        {"name": s["name"], "category": s["category"], "source": "github"}
+        for s in merge_skills(per_repo)
+    ]
+
+
+async def _fetch_github_cached(github_url: str, force: bool = False) -> dict:
+    """Profile fetch behind a 300 s cache; force re-fetches and refreshes the entry."""
+    key = github_url.strip().rstrip("/").lower()
+    data = None if force else _GITHUB_PROFILE_CACHE.get(key)
+    if data is None:
+        data = await fetch_github_profile(github_url, force=force)
+        _GITHUB_PROFILE_CACHE[key] = data
+    return data
+
+
+async def _index_in_background(index_fn, model, user_id: int, *args, **kwargs) -> None:
+    """
+    Embed + index a profile source off the request path, then mark the rows
+    indexed and drop caches that may hold results from the previous index.
+    """
+    try:
+        await asyncio.to_thread(index_fn, user_id, *args, **kwargs)
+    except Exception:
+        logger.exception("Background %s failed for user %s", index_fn.__name__, user_id)
+        return
+    invalidate_retrieval_cache(user_id)
+    semantic_cache.invalidate_user(user_id)
+    result_cache.invalidate_user(user_id)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(model).where(model.user_id == user_id).values(chroma_indexed=1)
+        )
+        await session.commit()
+
+
 async def _get_resume(db, user_id):
     r = await db.execute(select(Resume).where(Resume.user_id == user_id))
     return r.scalar_one_or_none()
@@ -341,32 +443,8 @@ async def _get_skills(db, user_id):
         select(Skill).where(Skill.user_id == user_id)
         .order_by(Skill.frequency.desc())
     )
-    all_skills = r.scalars().all()
-
-    # Merge any duplicate rows (same name, case-insensitive) into one
-    seen: dict[str, Skill] = {}
-    to_delete: list[Skill] = []
-    for skill in all_skills:
-        key = skill.name.lower()
-        if key not in seen:
-            seen[key] = skill
-        else:
-            # Accumulate frequency into the first-seen row, mark this one for deletion
-            seen[key].frequency += skill.frequency
-            if skill.sources:
-                merged_sources = list(seen[key].sources or [])
-                for src in skill.sources:
-                    if src not in merged_sources:
-                        merged_sources.append(src)
-                seen[key].sources = merged_sources
-            to_delete.append(skill)
-
-    if to_delete:
-        for dup in to_delete:
-            await db.delete(dup)
-        await db.flush()
-
-    return list(seen.values())
+    # Case-insensitive uniqueness is enforced by ux_skills_user_lower_name
+    return r.scalars().all()
 
 
 async def _upsert_skills(db, user_id: int, skills: list[dict]) -> None:
@@ -385,36 +463,34 @@ async def _upsert_skills(db, user_id: int, skills: list[dict]) -> None:
             # Merge frequencies
             seen[key]["frequency"] = seen[key].get("frequency", 1) + skill.get("frequency", 1) - 1
 
-    for key, skill in seen.items():
-        name = skill.get("name", "").strip()
-        source = skill.get("source", "unknown")
-
-        # Use scalars().all() then take first to safely handle any existing dupes in DB
-        result = await db.execute(
-            select(Skill).where(
-                Skill.user_id == user_id,
-                func.lower(Skill.name) == key,
-            )
-        )
-        rows = result.scalars().all()
-
-        if rows:
-            existing = rows[0]
-            # If somehow multiple dupes existed, delete the extras
-            for extra in rows[1:]:
-                await db.delete(extra)
-            existing.frequency += skill.get("frequency", 1)
-            if not existing.sources:
-                existing.sources = []
-            if source not in existing.sources:
-                existing.sources = existing.sources + [source]
-            db.add(existing)
-        else:
-            db.add(Skill(
-                user_id=user_id,
-                name=name,
-                category=skill.get("category", "Other"),
-                frequency=skill.get("frequency", 1),
-                sources=[source],
-            ))
-    await db.flush()
+    if not seen:
+        return
+
+    rows = [
+        {
+            "user_id":   user_id,
+            "name":      skill.get("name", "").strip(),
+            "category":  skill.get("category", "Other"),
+            "frequency": skill.get("frequency", 1),
+            "sources":   [skill.get("source", "unknown")],
+        }
+        for skill in seen.values()
+    ]
+
+    # One INSERT ... ON CONFLICT for the whole batch: bump frequency and append
+    # the new source to an existing row instead of a SELECT + write per skill
+    stmt = pg_insert(Skill).values(rows)
+    existing_sources = func.coalesce(cast(Skill.sources, JSONB), literal_column("'[]'::jsonb"))
+    new_sources = cast(stmt.excluded.sources, JSONB)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Skill.user_id, func.lower(Skill.name)],
+        set_={
+            "frequency":  func.coalesce(Skill.frequency, 0) + stmt.excluded.frequency,
+            "sources":    case(
+                (existing_sources.contains(new_sources), Skill.sources),
+                else_=cast(existing_sources.concat(new_sources), JSON),
+            ),
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
@@ -153,6 +153,17 @@ class JobApplicationResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class JobApplicationSummary(BaseModel):
+    """List-view row: no resume / cover letter / JD text."""
+    id: int
+    job_title: Optional[str]
+    company: Optional[str]
+    ats_score: Optional[float]
+    grade: Optional[str]
+    status: str
+    created_at: datetime
+
+
 class ApplicationStatusUpdate(BaseModel):
     status: str
     notes: Optional[str] = None
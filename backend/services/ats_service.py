@@ -8,7 +8,10 @@ Returns a comprehensive breakdown with actionable feedback.
 
 import re
 from collections import Counter
+from functools import lru_cache
+from itertools import chain, islice
 from typing import Optional
+
 from config import settings
 
 
@@ -36,8 +39,12 @@ def compute_ats_score(
     jd_lower     = job_description.lower()
     resume_lower = resume_text.lower()
 
+    # JD-side state feeds both the keyword and skill components and is memoised
+    # per JD, so re-scoring a new resume draft only pays for the resume scans
+    jd_keywords, jd_probes = _jd_analysis(jd_lower)
+
     # ── Component 1: Keyword Score (40%) ──────────────────────────────────
-    kw_result = _keyword_score(resume_lower, jd_lower)
+    kw_result = _keyword_score(resume_lower, jd_probes)
 
     # ── Component 2: Semantic Score (30%) ─────────────────────────────────
     if semantic_similarity is not None:
@@ -50,7 +57,7 @@ def compute_ats_score(
 
     # ── Component 3: Skill Overlap Score (20%) ────────────────────────────
     skill_result = _skill_overlap_score(
-        resume_lower, jd_lower, user_skills or []
+        resume_lower, jd_keywords, user_skills or []
     )
 
     # ── Component 4: Format Score (10%) ───────────────────────────────────
@@ -98,76 +105,93 @@ def compute_ats_score(
 
 # ── Keyword Scoring ───────────────────────────────────────────────────────────
 
+_STOP_WORDS: frozenset[str] = frozenset({
+    "the","a","an","and","or","but","in","on","at","to","for","of","with",
+    "is","are","was","were","be","been","have","has","had","will","would",
+    "could","should","we","you","they","this","that","these","those","it",
+    "its","as","by","from","about","into","each","which","all","also",
+    "more","such","than","other","can","our","your","their","then","when",
+    "use","using","used","must","able","well","good","work","role","team",
+    "job","candidate","required","preferred","include","including","strong",
+    "experience","knowledge","ability","skills","excellent","opportunity",
+})
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#.\-]*")
+
+# Always-included tech terms, even at frequency 1
+_TECH_RE = re.compile(
+    r"\b(python|r\b|sql|pandas|numpy|scikit[-\s]?learn|tensorflow|pytorch|"
+    r"keras|spark|hadoop|aws|azure|gcp|docker|kubernetes|git|linux|"
+    r"machine learning|deep learning|nlp|computer vision|data science|"
+    r"analytics|statistics|tableau|power ?bi|excel|matlab|java|scala|"
+    r"javascript|typescript|react|node\.?js|flask|fastapi|django|"
+    r"postgresql|mysql|mongodb|elasticsearch|kafka|redis|airflow|"
+    r"mlops|llm|transformers|hugging ?face|langchain|rag|etl|"
+    r"xgboost|lightgbm|random forest|neural network|bert|gpt|"
+    r"plotly|matplotlib|seaborn|scikit|sklearn|scipy|"
+    r"data engineer|data analyst|data scientist|mlflow|wandb|"
+    r"neo4j|cassandra|bigquery|snowflake|dbt|looker|streamlit)\b"
+)
+
+
 def extract_jd_keywords(jd_text: str) -> list[str]:
     """
     Extract meaningful keywords from JD.
     Prioritizes tech terms, tools, methodologies.
     """
-    stop_words = {
-        "the","a","an","and","or","but","in","on","at","to","for","of","with",
-        "is","are","was","were","be","been","have","has","had","will","would",
-        "could","should","we","you","they","this","that","these","those","it",
-        "its","as","by","from","about","into","each","which","all","also",
-        "more","such","than","other","can","our","your","their","then","when",
-        "use","using","used","must","able","well","good","work","role","team",
-        "job","candidate","required","preferred","include","including","strong",
-        "experience","knowledge","ability","skills","excellent","opportunity",
-    }
+    return list(_jd_analysis(jd_text.lower())[0])
+
 
-    text = jd_text.lower()
+@lru_cache(maxsize=512)
+def _jd_analysis(jd_lower: str) -> tuple[tuple[str, ...], tuple[tuple[str, str], ...]]:
+    """Everything the scorer derives from the JD alone: (keywords, keyword probes)."""
+    keywords = _jd_keywords(jd_lower)
+    return keywords, _keyword_probes(keywords)
 
+
+def _jd_keywords(text: str) -> tuple[str, ...]:
+    """Keyword extraction over an already-lowercased JD."""
     # Single tokens
-    tokens = re.findall(r"[a-z][a-z0-9+#.\-]*", text)
-    filtered = [t for t in tokens if len(t) > 2 and t not in stop_words]
+    tokens = _TOKEN_RE.findall(text)
+    filtered = [t for t in tokens if len(t) > 2 and t not in _STOP_WORDS]
 
-    # 2-grams
-    bigrams = [
-        f"{filtered[i]} {filtered[i+1]}"
-        for i in range(len(filtered) - 1)
-        if len(filtered[i]) > 2 and len(filtered[i+1]) > 2
-        and filtered[i] not in stop_words and filtered[i+1] not in stop_words
-    ]
+    # 2-grams (filtered already excludes stop words and short tokens)
+    bigrams = map(" ".join, zip(filtered, islice(filtered, 1, None)))
 
     # Always include tech terms even if frequency = 1
-    tech = re.findall(
-        r"\b(python|r\b|sql|pandas|numpy|scikit[-\s]?learn|tensorflow|pytorch|"
-        r"keras|spark|hadoop|aws|azure|gcp|docker|kubernetes|git|linux|"
-        r"machine learning|deep learning|nlp|computer vision|data science|"
-        r"analytics|statistics|tableau|power ?bi|excel|matlab|java|scala|"
-        r"javascript|typescript|react|node\.?js|flask|fastapi|django|"
-        r"postgresql|mysql|mongodb|elasticsearch|kafka|redis|airflow|"
-        r"mlops|llm|transformers|hugging ?face|langchain|rag|etl|"
-        r"xgboost|lightgbm|random forest|neural network|bert|gpt|"
-        r"plotly|matplotlib|seaborn|scikit|sklearn|scipy|"
-        r"data engineer|data analyst|data scientist|mlflow|wandb|"
-        r"neo4j|cassandra|bigquery|snowflake|dbt|looker|streamlit)\b",
-        text,
-    )
+    tech = _TECH_RE.findall(text)
 
-    freq = Counter(filtered + bigrams)
+    freq = Counter(chain(filtered, bigrams))
     top = [w for w, _ in freq.most_common(80)]
-    all_kw = list(dict.fromkeys(top + list(set(tech))))
-    return all_kw
+    return tuple(dict.fromkeys(top + list(set(tech))))
 
 
-def _keyword_score(resume_lower: str, jd_lower: str) -> dict:
-    keywords = extract_jd_keywords(jd_lower)
-    if not keywords:
+def _keyword_probes(keywords: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+    """
+    Pair each keyword with the one substring that decides whether it matches.
+    The stem is a prefix of the keyword, so "kw in text or stem in text" is just
+    "stem in text" – one scan per keyword. Short stems fall back to the keyword.
+    """
+    pairs = []
+    for kw in keywords:
+        stem = kw.rstrip("ing").rstrip("ed").rstrip("s")
+        pairs.append((kw, stem if len(stem) > 4 else kw))
+    return tuple(pairs)
+
+
+def _keyword_score(resume_lower: str, probes: tuple[tuple[str, str], ...]) -> dict:
+    if not probes:
         return {"score": 70.0, "matches": [], "missing": []}
 
     matches, missing = [], []
-    for kw in keywords:
-        if kw in resume_lower:
+    for kw, probe in probes:
+        # Exact hit or partial stem match
+        if probe in resume_lower:
             matches.append(kw)
         else:
-            # Partial stem match
-            stem = kw.rstrip("ing").rstrip("ed").rstrip("s")
-            if len(stem) > 4 and stem in resume_lower:
-                matches.append(kw)
-            else:
-                missing.append(kw)
-
-    ratio = len(matches) / len(keywords)
+            missing.append(kw)
+
+    ratio = len(matches) / len(probes)
     # Slight non-linear boost
     score = min(100.0, (ratio ** 0.75) * 100)
 
@@ -182,19 +206,18 @@ def _keyword_score(resume_lower: str, jd_lower: str) -> dict:
 
 def _skill_overlap_score(
     resume_lower: str,
-    jd_lower: str,
+    jd_keywords: tuple[str, ...],
     user_skills: list[str],
 ) -> dict:
     """Score based on how many JD-mentioned skills appear in resume + profile."""
-    jd_keywords = extract_jd_keywords(jd_lower)
 
-    # Normalize user skills
-    user_skill_lower = [s.lower() for s in user_skills]
-    all_candidate_text = resume_lower + " " + " ".join(user_skill_lower)
+    # Normalize user skills – scanned separately so the resume isn't copied
+    # into a combined candidate string on every call
+    skills_text = " ".join(s.lower() for s in user_skills)
 
     matched, missing = [], []
     for kw in jd_keywords[:40]:  # Focus on top 40
-        if kw in all_candidate_text:
+        if kw in resume_lower or kw in skills_text:
             matched.append(kw)
         else:
             missing.append(kw)
@@ -211,16 +234,33 @@ def _skill_overlap_score(
 
 # ── Format Scoring ────────────────────────────────────────────────────────────
 
-_FORMAT_PENALTIES = [
-    (r"\|.*\|.*\|",                      "Tables detected – ATS may misparse",         25),
-    (r"[\u2600-\u26FF\u2700-\u27BF]",   "Emoji characters – ATS unfriendly",           15),
-    (r"(photo|image|picture|graphic)",   "Graphic/image references – remove",           10),
-    (r"<[a-z][a-z0-9]*\b[^>]*>",        "HTML tags detected",                          20),
-]
+# group name → (pattern, message, penalty); order is the order issues are reported
+_FORMAT_PENALTIES = {
+    "table": (r"\|.*\|.*\|",                    "Tables detected – ATS may misparse",  25),
+    "emoji": (r"[\u2600-\u26FF\u2700-\u27BF]", "Emoji characters – ATS unfriendly",   15),
+    "media": (r"(?:photo|image|picture|graphic)", "Graphic/image references – remove",  10),
+    "html":  (r"<[a-z][a-z0-9]*\b[^>]*>",         "HTML tags detected",                  20),
+}
+
+# All penalty patterns in one scan. Each branch sits in a zero-width lookahead so
+# a match never consumes text another branch needs (e.g. an emoji inside a table
+# row), and the branches start on disjoint characters, so at most one fires per
+# position – same hits as running the patterns one by one.
+_FORMAT_RE = re.compile(
+    "|".join(f"(?=(?P<{name}>{p}))" for name, (p, _, _) in _FORMAT_PENALTIES.items()),
+    re.IGNORECASE,
+)
+
+
+def _count_long_lines(text: str, threshold: int = 180) -> int:
+    """Count lines longer than threshold characters."""
+    return sum(len(l) > threshold for l in text.split("\n"))
+
 
 _REQUIRED_SECTIONS = [
     "education", "experience", "skills", "projects", "summary"
 ]
+_SECTION_RE = re.compile(rf"\b({'|'.join(_REQUIRED_SECTIONS)})\b")
 
 
 def _format_score(resume_text: str) -> dict:
@@ -229,22 +269,25 @@ def _format_score(resume_text: str) -> dict:
 
     text_lower = resume_text.lower()
 
-    for pattern, message, penalty in _FORMAT_PENALTIES:
-        if re.search(pattern, resume_text, re.IGNORECASE):
+    found: set[str] = set()
+    for m in _FORMAT_RE.finditer(resume_text):
+        found.add(m.lastgroup)
+        if len(found) == len(_FORMAT_PENALTIES):
+            break
+    for name, (_, message, penalty) in _FORMAT_PENALTIES.items():
+        if name in found:
             issues.append(message)
             score -= penalty
 
     # Check for excessively long lines (multi-column layout)
-    long_lines = sum(1 for l in resume_text.split("\n") if len(l) > 180)
+    long_lines = _count_long_lines(resume_text)
     if long_lines > 5:
         issues.append("Multi-column layout detected – use single-column for ATS")
         score -= 15
 
-    # Missing essential sections
-    missing_sections = [
-        s for s in _REQUIRED_SECTIONS
-        if not re.search(rf"\b{s}\b", text_lower)
-    ]
+    # Missing essential sections (one scan for all of them)
+    found_sections = set(_SECTION_RE.findall(text_lower))
+    missing_sections = [s for s in _REQUIRED_SECTIONS if s not in found_sections]
     if missing_sections:
         score -= len(missing_sections) * 5
         issues.append(f"Missing sections: {', '.join(missing_sections)}")
@@ -3,52 +3,182 @@ GitHub Service – fetches repos, READMEs, and profile info via GitHub REST API
 Provides a structured summary for LLM injection and ChromaDB indexing.
 """
 
+import asyncio
 import httpx
-import base64
-from typing import Optional
+import heapq
+import inspect
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Optional
+
+import orjson
+from cachetools import TTLCache
+
 from config import settings
 
 
-async def fetch_github_profile(github_url_or_username: str) -> dict:
+_README_REPOS       = 5     # READMEs fetched per profile (top repos only)
+_README_MAX_BYTES   = 8192  # raw bytes kept – ample for the 1500-char excerpt
+_README_CLEAN_CHARS = 6000  # chars run through markdown/whitespace cleanup
+_README_EXCERPT     = 1500
+
+_MD_STRIP_RE = re.compile(r"[#*`\[\]()!]+")
+_WS_RE       = re.compile(r"\s+")
+
+# Per-endpoint response caches (keyed by lowercased username): profiles and
+# READMEs barely change within minutes, the repo list (push order) a bit more
+_USER_CACHE:   TTLCache = TTLCache(maxsize=256,  ttl=600)
+_REPOS_CACHE:  TTLCache = TTLCache(maxsize=256,  ttl=300)
+_README_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=1800)
+
+# Cache-miss sentinel: None is a valid cached README ("repo has no README")
+_MISS = object()
+
+# URL → (ETag, parsed payload) for conditional GETs. Kept far longer than the
+# caches above: a 304 revalidation is free against the rate limit.
+_ETAG_STORE: TTLCache = TTLCache(maxsize=4096, ttl=86400)
+
+# Tier-2 (Redis, when GITHUB_REDIS_URL is set) TTLs: outlive worker restarts
+# and are shared by every uvicorn worker, so they can be longer than tier 1
+_L2_USER_TTL   = 3600
+_L2_REPOS_TTL  = 900
+_L2_README_TTL = 1800
+
+# Last seen X-RateLimit-Remaining / X-RateLimit-Reset; README fetches (optional
+# extras) stop below the floor so the last slots go to profile + repo calls
+_RATE_LIMIT_FLOOR = 10
+_rate_limit: tuple[int, float] = (_RATE_LIMIT_FLOOR, 0.0)
+
+# Token bucket shared by every GitHub request in this process: concurrent profile
+# fetches queue briefly instead of bursting into the secondary rate limit (403)
+_GH_RATE  = max(settings.GITHUB_RPS, 0.1)
+_GH_BURST = max(_GH_RATE, 1.0)
+_gh_tokens  = _GH_BURST
+_gh_updated = time.monotonic()
+_gh_lock    = asyncio.Lock()
+
+
+# ── HTTP Client ───────────────────────────────────────────────────────────────
+# Shared keep-alive client: a profile fetch is 2 + 5 requests to the same host,
+# so reusing pooled connections skips a TCP + TLS handshake on each of them.
+
+_gh_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_gh_client() -> httpx.AsyncClient:
+    global _gh_client
+    if _gh_client is None:
+        _gh_client = httpx.AsyncClient(
+            timeout=20,
+            headers=_build_headers(),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+    return _gh_client
+
+
+async def close_gh_client() -> None:
+    global _gh_client, _redis
+    if _gh_client is not None:
+        await _gh_client.aclose()
+        _gh_client = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+# ── Shared Cache (tier 2) ─────────────────────────────────────────────────────
+# Lookup order is in-process TTLCache → Redis → GitHub. Redis is optional: with
+# no URL configured, or when it is unreachable, every lookup is a miss.
+
+_redis = None
+
+
+def _get_redis():
+    global _redis
+    if _redis is None and settings.GITHUB_REDIS_URL:
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise ImportError("Install redis: pip install redis")
+        _redis = Redis.from_url(settings.GITHUB_REDIS_URL, socket_timeout=0.5)
+    return _redis
+
+
+async def _l2_get(key: str) -> tuple[bool, Any]:
+    """(hit, value) for a tier-2 key; a cached None (e.g. no README) is a hit."""
+    r = _get_redis()
+    if r is None:
+        return False, None
+    try:
+        raw = await r.get(key)
+    except Exception:
+        return False, None
+    return (False, None) if raw is None else (True, orjson.loads(raw))
+
+
+async def _l2_set(key: str, value: Any, ttl: int) -> None:
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        await r.set(key, orjson.dumps(value), ex=ttl)
+    except Exception:
+        pass
+
+
+async def fetch_github_profile(github_url_or_username: str, force: bool = False) -> dict:
     """
     Main entry: fetch full GitHub profile + top repos.
     Returns structured dict ready for DB storage + LLM injection.
+    force skips the in-process and Redis caches (and refreshes them); requests
+    still revalidate by ETag, so unchanged resources cost no rate limit.
     """
     username = _extract_username(github_url_or_username)
-    headers  = _build_headers()
-
-    async with httpx.AsyncClient(timeout=20, headers=headers) as client:
-        # User profile
-        user_resp = await client.get(f"{settings.GITHUB_API_BASE}/users/{username}")
-        if user_resp.status_code == 404:
-            raise ValueError(f"GitHub user '{username}' not found.")
-        user_resp.raise_for_status()
-        user_data = user_resp.json()
-
-        # All repos (up to 100)
-        repos_resp = await client.get(
-            f"{settings.GITHUB_API_BASE}/users/{username}/repos",
-            params={"per_page": 100, "sort": "pushed", "type": "owner"},
-        )
-        repos_resp.raise_for_status()
-        raw_repos = repos_resp.json()
+    client   = _get_gh_client()
+    key      = username.lower()
+
+    # User profile
+    user_data = None if force else _USER_CACHE.get(key)
+    if user_data is None:
+        hit, user_data = (False, None) if force else await _l2_get(f"gh:{key}:user")
+        if not hit:
+            status, user_data = await _conditional_get(
+                client, f"{settings.GITHUB_API_BASE}/users/{username}"
+            )
+            if status == 404:
+                raise ValueError(f"GitHub user '{username}' not found.")
+            await _l2_set(f"gh:{key}:user", user_data, _L2_USER_TTL)
+        _USER_CACHE[key] = user_data
+
+    # All repos (up to 100)
+    raw_repos = None if force else _REPOS_CACHE.get(key)
+    if raw_repos is None:
+        hit, raw_repos = (False, None) if force else await _l2_get(f"gh:{key}:repos")
+        if not hit:
+            _, raw_repos = await _conditional_get(
+                client,
+                f"{settings.GITHUB_API_BASE}/users/{username}/repos",
+                params={"per_page": 100, "sort": "pushed", "type": "owner"},
+            )
+            await _l2_set(f"gh:{key}:repos", raw_repos, _L2_REPOS_TTL)
+        _REPOS_CACHE[key] = raw_repos
 
-    # Filter forks, sort by (stars + recency), take top N
-    own_repos = [r for r in raw_repos if not r.get("fork", False)]
-    own_repos.sort(
+    # Filter forks, take top N by (stars + recency) – partial heap select, no full sort
+    top_repos = heapq.nlargest(
+        settings.GITHUB_MAX_REPOS,
+        (r for r in raw_repos if not r.get("fork", False)),
         key=lambda r: (r.get("stargazers_count", 0) * 2 + (1 if r.get("pushed_at") else 0)),
-        reverse=True,
     )
-    top_repos = own_repos[:settings.GITHUB_MAX_REPOS]
+    repos = [_parse_repo(repo) for repo in top_repos]
 
-    # Fetch README for top 5 repos
-    repos = []
-    for repo in top_repos:
-        repo_data = _parse_repo(repo)
-        # Fetch README for top repos (skip if rate-limited)
-        if len(repos) < 5:
-            repo_data["readme_text"] = await _fetch_readme(username, repo["name"], headers)
-        repos.append(repo_data)
+    # Fetch READMEs for the top 5 repos concurrently over the same client
+    readmes = await asyncio.gather(*(
+        _fetch_readme(client, username, repo["repo_name"], force)
+        for repo in repos[:_README_REPOS]
+    ))
+    for repo, readme in zip(repos, readmes):
+        repo["readme_text"] = readme
 
     summary = _build_llm_summary(username, user_data, repos)
 
@@ -63,29 +193,119 @@ async def fetch_github_profile(github_url_or_username: str) -> dict:
     }
 
 
-async def _fetch_readme(username: str, repo_name: str, headers: dict) -> Optional[str]:
+async def _fetch_readme(
+    client: httpx.AsyncClient, username: str, repo_name: str,
+    force: bool = False,
+) -> Optional[str]:
     """Fetch and decode README.md for a repo (max 1500 chars)."""
+    key = (username.lower(), repo_name)
+    # Single get(): an in/[] pair can raise KeyError if the entry expires between them
+    excerpt = _MISS if force else _README_CACHE.get(key, _MISS)
+    if excerpt is not _MISS:
+        return excerpt
+    l2_key = f"gh:{key[0]}:readme:{repo_name}"
+    hit, excerpt = (False, None) if force else await _l2_get(l2_key)
+    if hit:
+        _README_CACHE[key] = excerpt
+        return excerpt
+    if _near_rate_limit():
+        return None
     try:
-        async with httpx.AsyncClient(timeout=10, headers=headers) as client:
-            r = await client.get(
-                f"{settings.GITHUB_API_BASE}/repos/{username}/{repo_name}/readme"
-            )
-            if r.status_code == 200:
-                content_b64 = r.json().get("content", "")
-                # GitHub returns base64 with newlines
-                decoded = base64.b64decode(
-                    content_b64.replace("\n", "")
-                ).decode("utf-8", errors="ignore")
-                # Strip markdown syntax for cleaner embedding
-                import re
-                clean = re.sub(r"[#*`\[\]()!]+", " ", decoded)
-                clean = re.sub(r"\s+", " ", clean).strip()
-                return clean[:1500]
+        status, excerpt = await _conditional_get(
+            client,
+            f"{settings.GITHUB_API_BASE}/repos/{username}/{repo_name}/readme",
+            # Decode + regex cleanup runs in a worker thread, off the event loop
+            parse=lambda r: asyncio.to_thread(_clean_readme, r.content),
+            # Raw media type: the README body itself, no JSON envelope or base64
+            headers={"Accept": "application/vnd.github.raw"},
+            timeout=10,
+        )
+        # A 404 means the repo has no README – remember that too
+        _README_CACHE[key] = excerpt
+        await _l2_set(l2_key, excerpt, _L2_README_TTL)
+        return excerpt
     except Exception:
         pass
     return None
 
 
+def _clean_readme(raw: bytes) -> str:
+    # Only the head of the README is ever kept, so stop there
+    raw = raw[:_README_MAX_BYTES]
+    # Cap the text the regexes scan: whitespace collapse and markup
+    # stripping shrink it, but never by 4x on real READMEs
+    decoded = raw.decode("utf-8", errors="ignore")[:_README_CLEAN_CHARS]
+    # Strip markdown syntax for cleaner embedding
+    clean = _MD_STRIP_RE.sub(" ", decoded)
+    clean = _WS_RE.sub(" ", clean).strip()
+    return clean[:_README_EXCERPT]
+
+
+async def _conditional_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: Optional[dict] = None,
+    parse: Callable[[httpx.Response], Any] = httpx.Response.json,
+    headers: Optional[dict] = None,
+    **kwargs,
+) -> tuple[int, Any]:
+    """
+    GET with If-None-Match revalidation. Returns (status, parsed payload):
+    a 304 replays the payload stored with the ETag, 404 returns (404, None),
+    other error statuses raise. headers are merged over the client defaults;
+    parse may return an awaitable (e.g. to offload CPU-heavy decoding).
+    """
+    store_key = (url, tuple(sorted((params or {}).items())))
+    stored = _ETAG_STORE.get(store_key)
+    if stored:
+        headers = {**(headers or {}), "If-None-Match": stored[0]}
+
+    await _gh_throttle()
+    resp = await client.get(url, params=params, headers=headers, **kwargs)
+    _record_rate_limit(resp)
+    if resp.status_code == 304 and stored:
+        return 200, stored[1]
+    if resp.status_code == 404:
+        return 404, None
+    resp.raise_for_status()
+
+    payload = parse(resp)
+    if inspect.isawaitable(payload):
+        payload = await payload
+    if etag := resp.headers.get("ETag"):
+        _ETAG_STORE[store_key] = (etag, payload)
+    return resp.status_code, payload
+
+
+async def _gh_throttle() -> None:
+    """Take one token from the bucket, sleeping until it refills if empty."""
+    global _gh_tokens, _gh_updated
+    async with _gh_lock:                    # waiters are served FIFO
+        now = time.monotonic()
+        _gh_tokens = min(_GH_BURST, _gh_tokens + (now - _gh_updated) * _GH_RATE)
+        _gh_updated = now
+        if _gh_tokens < 1:
+            await asyncio.sleep((1 - _gh_tokens) / _GH_RATE)
+            _gh_tokens, _gh_updated = 1.0, time.monotonic()
+        _gh_tokens -= 1
+
+
+def _record_rate_limit(resp: httpx.Response) -> None:
+    global _rate_limit
+    remaining = resp.headers.get("X-RateLimit-Remaining")
+    reset     = resp.headers.get("X-RateLimit-Reset")
+    if remaining is not None and reset is not None:
+        try:
+            _rate_limit = (int(remaining), float(reset))
+        except ValueError:
+            pass
+
+
+def _near_rate_limit() -> bool:
+    remaining, reset_at = _rate_limit
+    return remaining < _RATE_LIMIT_FLOOR and time.time() < reset_at
+
+
 def _parse_repo(repo: dict) -> dict:
     return {
         "repo_name":    repo["name"],
@@ -109,15 +329,9 @@ def _build_llm_summary(username: str, user_data: dict, repos: list[dict]) -> str
         lines.append(f"Bio: {user_data['bio']}")
 
     # Language stats
-    lang_count: dict[str, int] = {}
-    for r in repos:
-        lang = r.get("language", "")
-        if lang:
-            lang_count[lang] = lang_count.get(lang, 0) + 1
-
+    lang_count = Counter(r["language"] for r in repos if r.get("language"))
     if lang_count:
-        sorted_langs = sorted(lang_count.items(), key=lambda x: x[1], reverse=True)
-        lines.append(f"Languages: {', '.join(f'{l}({c})' for l,c in sorted_langs[:6])}")
+        lines.append(f"Languages: {', '.join(f'{l}({c})' for l,c in lang_count.most_common(6))}")
 
     lines.append(f"\nTop {min(len(repos), 10)} Repositories:")
     for repo in repos[:10]:
@@ -7,29 +7,66 @@ Reviewer: llama3.1:8b (critique & improvement pass)
 import httpx
 import json
 import asyncio
+import re
+import time
+import orjson
 from typing import AsyncGenerator, Optional
 from config import settings
 
 
+# ── HTTP Client ───────────────────────────────────────────────────────────────
+# One pooled client for every Ollama call: keep-alive connections are reused
+# instead of a fresh TCP connect per generation / health probe.
+
+_ollama_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_ollama_client() -> httpx.AsyncClient:
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = httpx.AsyncClient(
+            timeout=settings.LLM_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=16),
+        )
+    return _ollama_client
+
+
+async def close_ollama_client() -> None:
+    global _ollama_client
+    if _ollama_client is not None:
+        await _ollama_client.aclose()
+        _ollama_client = None
+
+
 # ── Health Checks ─────────────────────────────────────────────────────────────
 
 async def is_ollama_running() -> bool:
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            r = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
-            return r.status_code == 200
+        r = await _get_ollama_client().get(f"{settings.OLLAMA_BASE_URL}/api/tags", timeout=5)
+        return r.status_code == 200
     except Exception:
         return False
 
 
+# (fetched_at, model names): installed models change on the order of hours
+_MODELS_TTL = 60.0
+_models_cache: Optional[tuple[float, list[str]]] = None
+
+
 async def get_available_models() -> list[str]:
+    global _models_cache
+    if _models_cache is not None and time.monotonic() - _models_cache[0] < _MODELS_TTL:
+        return _models_cache[1]
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            r = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
-            data = r.json()
-            return [m["name"] for m in data.get("models", [])]
+        r = await _get_ollama_client().get(f"{settings.OLLAMA_BASE_URL}/api/tags", timeout=5)
+        r.raise_for_status()
+        data = orjson.loads(r.content)
+        models = [m["name"] for m in data.get("models", [])]
     except Exception:
+        _models_cache = None
         return []
+    _models_cache = (time.monotonic(), models)
+    return models
 
 
 async def is_model_available(model: str) -> bool:
@@ -56,31 +93,41 @@ async def _chat_stream(
             "repeat_penalty": 1.1,
         },
     }
-    async with httpx.AsyncClient(timeout=settings.LLM_TIMEOUT) as client:
-        async with client.stream(
-            "POST",
-            f"{settings.OLLAMA_BASE_URL}/api/chat",
-            json=payload,
-        ) as response:
-            response.raise_for_status()
-            async for line in response.aiter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line)
-                        if token := chunk.get("message", {}).get("content", ""):
-                            yield token
-                        if chunk.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
+    async with _get_ollama_client().stream(
+        "POST",
+        f"{settings.OLLAMA_BASE_URL}/api/chat",
+        json=payload,
+    ) as response:
+        response.raise_for_status()
+        # NDJSON: split raw bytes on b"\n" and decode each line with orjson,
+        # skipping aiter_lines()' str decoding and line-splitting layer
+        buf = bytearray()
+        async for data in response.aiter_bytes():
+            buf += data
+            start = 0
+            while (nl := buf.find(b"\n", start)) >= 0:
+                line = buf[start:nl]
+                start = nl + 1
+                if not line.strip():
+                    continue
+                try:
+                    chunk = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                if token := chunk.get("message", {}).get("content", ""):
+                    yield token
+                if chunk.get("done"):
+                    return
+            del buf[:start]
 
 
 async def _chat(
     messages: list[dict],
     model: str,
     temperature: float = None,
+    json_mode: bool = False,
 ) -> str:
-    """Non-streaming chat – returns complete response."""
+    """Non-streaming chat – returns complete response. json_mode constrains output to JSON."""
     payload = {
         "model": model,
         "messages": messages,
@@ -92,21 +139,29 @@ async def _chat(
             "repeat_penalty": 1.1,
         },
     }
-    async with httpx.AsyncClient(timeout=settings.LLM_TIMEOUT) as client:
-        r = await client.post(
-            f"{settings.OLLAMA_BASE_URL}/api/chat",
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()["message"]["content"].strip()
+    if json_mode:
+        payload["format"] = "json"
+    r = await _get_ollama_client().post(
+        f"{settings.OLLAMA_BASE_URL}/api/chat",
+        json=payload,
+    )
+    r.raise_for_status()
+    return orjson.loads(r.content)["message"]["content"].strip()
 
 
 # ── System Prompts ────────────────────────────────────────────────────────────
 
-_SYSTEM_RESUME_EXPERT = f"""You are an elite ATS optimization specialist and professional resume writer.
+# The resume and cover-letter calls share one system prompt and open their user
+# message with the same JD + GitHub block (_shared_context). The chat template
+# therefore renders a byte-identical prefix for both, and Ollama's prompt cache
+# (llama.cpp KV reuse) skips re-prefilling it for the back-to-back cover-letter
+# call. Keep task-specific instructions AFTER the shared block.
+_SYSTEM_CAREER_EXPERT = f"""You are an elite ATS optimization specialist, professional resume writer and career advisor.
 {settings.STUDENT_CONTEXT}
+Never fabricate anything — only reframe the candidate's real experience.
+"""
 
-STRICT OUTPUT RULES (never break these):
+_RESUME_RULES = """STRICT OUTPUT RULES (never break these):
 1. EXACTLY ONE PAGE — keep total word count under 650 words. Cut ruthlessly.
 2. EACH SECTION APPEARS EXACTLY ONCE — never repeat SKILLS, EXPERIENCE, or any header.
 3. SECTION ORDER (top to bottom, ALL CAPS headers):
@@ -122,10 +177,7 @@ STRICT OUTPUT RULES (never break these):
 7. Never fabricate anything — only reframe real experience
 """
 
-_SYSTEM_COVER_EXPERT = f"""You are an expert career advisor specializing in crafting compelling motivation letters.
-{settings.STUDENT_CONTEXT}
-
-Your cover letters must:
+_COVER_RULES = """Your cover letters must:
 - Be 300-380 words, 4 paragraphs
 - Feel 100% personal and tailored – no generic phrases
 - Include exact keywords from the job description naturally
@@ -134,29 +186,28 @@ Your cover letters must:
 - Close with strong internship availability call-to-action
 """
 
+
+def _shared_context(job_description: str, github_summary: str) -> str:
+    """Common prefix of the resume and cover-letter user messages."""
+    gh_section = f"\n\n## GITHUB PROJECTS:\n{github_summary}" if github_summary else ""
+    return f"""## TARGET JOB DESCRIPTION:
+{job_description[:2000]}{gh_section}
+
+"""
+
+
 _SYSTEM_REVIEWER = """You are a brutally honest senior tech recruiter reviewing a tailored resume.
 Your job is to identify weaknesses and suggest specific improvements.
 Be concise, specific, and actionable. Never be vague.
 """
 
 
-# ── Resume Optimization ───────────────────────────────────────────────────────
-
-async def tailor_resume_stream(
-    original_resume: str,
-    job_description: str,
-    rag_context: str = "",
-    github_summary: str = "",
-) -> AsyncGenerator[str, None]:
-    """Stream a tailored resume token by token."""
-    rag_section = f"\n\n## RETRIEVED RELEVANT CONTEXT (use this):\n{rag_context}" if rag_context else ""
-    gh_section  = f"\n\n## GITHUB PROJECTS (incorporate relevant ones):\n{github_summary}" if github_summary else ""
-
-    messages = [
-        {"role": "system", "content": _SYSTEM_RESUME_EXPERT},
-        {"role": "user", "content": f"""
-## TASK: Create a 1-page ATS-optimised resume tailored to the job description.
+# Static prompt bodies, rendered once at import: per call only the variable
+# slots ({resume}, {rag}, ...) are filled via format_map.
+_RESUME_TASK_TEMPLATE = """## TASK: Create a 1-page ATS-optimised resume tailored to the job description.
+Incorporate the relevant GitHub projects above.
 
+""" + _RESUME_RULES + """
 ## STEP 1 – Extract JD keywords:
 Identify: required skills, tools, frameworks, methodologies, domain terms from the JD.
 
@@ -194,12 +245,8 @@ MSc Data Science & Analytics | EPITA Paris | Sep 2024 – Present
 [Prior degree] | [School] | [Year]
 
 ## ORIGINAL RESUME (source of truth – never invent):
-{original_resume[:4000]}
-{rag_section}
-{gh_section}
-
-## TARGET JOB DESCRIPTION:
-{job_description[:2000]}
+{resume}
+{rag}
 
 ## FINAL CHECK before outputting:
 - Did I write SKILLS exactly once? ✓ 
@@ -208,8 +255,116 @@ MSc Data Science & Analytics | EPITA Paris | Sep 2024 – Present
 - No section repeated? ✓
 
 Output ONLY the resume text. No explanations, no headers like "Here is", no commentary.
-"""},
+"""
+
+_COVER_TASK_TEMPLATE = """## TASK: Write a compelling cover letter / motivation letter.
+
+""" + _COVER_RULES + """
+## JOB:
+- Title: {job_title}
+- Company: {company}
+
+## STRUCTURE:
+**Paragraph 1** – Powerful hook: why this company, why this role, your #1 matching strength
+**Paragraph 2** – 2-3 key achievements from resume that DIRECTLY answer JD requirements (use keywords from JD)
+**Paragraph 3** – Technical alignment: show mastery of their stack using JD terminology + relevant GitHub projects
+**Paragraph 4** – Closing: enthusiasm, internship availability, call to action
+
+## CONSTRAINTS:
+- 300-380 words total
+- Use EXACT tech keywords: {key_terms}
+- Mention EPITA MSc Data Science & Analytics naturally
+- Sign as candidate from the resume
+{gh_note}
+
+## CANDIDATE RESUME (tailored):
+{resume}
+
+## OUTPUT:
+Cover letter only. Begin with the date line. No meta-commentary.
+"""
+
+_SYSTEM_REVIEW_ATS = _SYSTEM_REVIEWER + "You also act as an ATS system evaluator. Return JSON only.\n"
+
+# Literal JSON braces are doubled ({{ }}) for format_map
+_REVIEW_ATS_TEMPLATE = """Review this tailored resume against the job description, then evaluate it as an ATS system.
+
+## JOB DESCRIPTION (first 1500 chars):
+{jd}
+
+## TAILORED RESUME:
+{resume}
+
+Return ONLY this JSON:
+{{
+  "review": "<numbered text: 1. Top 3 strengths for this role 2. Top 3 weaknesses / missed opportunities 3. Specific wording improvements (quote original → suggest replacement) 4. Any redundancy to remove 5. Final verdict: Pass / Borderline / Fail for ATS>",
+  "ats": {{
+    "keyword_match_pct": <0-100>,
+    "relevance_score": <0-10>,
+    "top_matching_keywords": ["kw1", "kw2", "kw3", "kw4", "kw5"],
+    "critical_missing": ["miss1", "miss2", "miss3"],
+    "strengths": ["s1", "s2", "s3"],
+    "improvements": ["i1", "i2", "i3"],
+    "verdict": "<one sentence>"
+  }}
+}}"""
+
+
+# ── Context Budget ────────────────────────────────────────────────────────────
+
+# Tokens kept free for the generated resume; prompt size is estimated at ~4 chars/token.
+_RESUME_OUTPUT_TOKENS = 1200
+_RESUME_TEMPLATE_CHARS = len(_SYSTEM_CAREER_EXPERT) + len(_RESUME_TASK_TEMPLATE)
+
+
+def _budget_trim(sections: dict[str, str], max_chars: int) -> dict[str, str]:
+    """
+    Scale every section down by the same ratio so their total fits max_chars.
+    A prompt longer than num_ctx is silently truncated by Ollama and evicts the
+    cached prefix, so trimming here keeps inference on the fast path.
+    """
+    total = sum(len(v) for v in sections.values())
+    if total <= max_chars:
+        return sections
+    ratio = max(max_chars, 0) / total
+    return {k: v[:int(len(v) * ratio)] for k, v in sections.items()}
+
+
+# ── Resume Optimization ───────────────────────────────────────────────────────
+
+def _build_resume_messages(
+    original_resume: str,
+    job_description: str,
+    rag_context: str = "",
+    github_summary: str = "",
+) -> list[dict]:
+    """Chat messages for the resume-tailoring call (streamed or not)."""
+    shared = _shared_context(job_description, github_summary)
+    max_chars = (settings.LLM_NUM_CTX - _RESUME_OUTPUT_TOKENS) * 4
+    trimmed = _budget_trim(
+        {"resume": original_resume[:4000], "rag": rag_context},
+        max_chars - _RESUME_TEMPLATE_CHARS - len(shared),
+    )
+    rag_context = trimmed["rag"]
+    rag_section = f"\n\n## RETRIEVED RELEVANT CONTEXT (use this):\n{rag_context}" if rag_context else ""
+    task = _RESUME_TASK_TEMPLATE.format_map({
+        "resume": trimmed["resume"],
+        "rag":    rag_section,
+    })
+    return [
+        {"role": "system", "content": _SYSTEM_CAREER_EXPERT},
+        {"role": "user", "content": shared + task},
     ]
+
+
+async def tailor_resume_stream(
+    original_resume: str,
+    job_description: str,
+    rag_context: str = "",
+    github_summary: str = "",
+) -> AsyncGenerator[str, None]:
+    """Stream a tailored resume token by token."""
+    messages = _build_resume_messages(original_resume, job_description, rag_context, github_summary)
     async for token in _chat_stream(messages, settings.PRIMARY_MODEL):
         yield token
 
@@ -220,56 +375,45 @@ async def tailor_resume(
     rag_context: str = "",
     github_summary: str = "",
 ) -> str:
-    result = ""
-    async for token in tailor_resume_stream(
-        original_resume, job_description, rag_context, github_summary
-    ):
-        result += token
-    return result
+    """Non-streaming variant: one Ollama response, no per-token NDJSON parsing."""
+    messages = _build_resume_messages(original_resume, job_description, rag_context, github_summary)
+    return await _chat(messages, settings.PRIMARY_MODEL)
 
 
 # ── Cover Letter Generation ───────────────────────────────────────────────────
 
+def _build_cover_messages(
+    tailored_resume: str,
+    job_description: str,
+    job_title: str = "",
+    company: str = "",
+    github_summary: str = "",
+) -> list[dict]:
+    """Chat messages for the cover-letter call (streamed or not)."""
+    task = _COVER_TASK_TEMPLATE.format_map({
+        "job_title": job_title or "the position",
+        "company":   company or "the company",
+        "key_terms": _extract_key_terms(job_description),
+        "gh_note":   "- Reference the most relevant GitHub projects above (2 at most)" if github_summary else "",
+        "resume":    tailored_resume[:3000],
+    })
+    return [
+        {"role": "system", "content": _SYSTEM_CAREER_EXPERT},
+        {"role": "user", "content": _shared_context(job_description, github_summary) + task},
+    ]
+
+
 async def generate_cover_letter_stream(
     tailored_resume: str,
     job_description: str,
     job_title: str = "",
     company: str = "",
-    github_highlights: str = "",
+    github_summary: str = "",
 ) -> AsyncGenerator[str, None]:
     """Stream a cover letter token by token."""
-    messages = [
-        {"role": "system", "content": _SYSTEM_COVER_EXPERT},
-        {"role": "user", "content": f"""
-## TASK: Write a compelling cover letter / motivation letter.
-
-## JOB:
-- Title: {job_title or "the position"}
-- Company: {company or "the company"}
-
-## STRUCTURE:
-**Paragraph 1** – Powerful hook: why this company, why this role, your #1 matching strength
-**Paragraph 2** – 2-3 key achievements from resume that DIRECTLY answer JD requirements (use keywords from JD)
-**Paragraph 3** – Technical alignment: show mastery of their stack using JD terminology + relevant GitHub projects
-**Paragraph 4** – Closing: enthusiasm, internship availability, call to action
-
-## CONSTRAINTS:
-- 300-380 words total
-- Use EXACT tech keywords: {_extract_key_terms(job_description)}
-- Mention EPITA MSc Data Science & Analytics naturally
-- Sign as candidate from the resume
-{f"- Reference relevant GitHub projects: {github_highlights}" if github_highlights else ""}
-
-## CANDIDATE RESUME (tailored):
-{tailored_resume[:3000]}
-
-## JOB DESCRIPTION:
-{job_description[:2000]}
-
-## OUTPUT:
-Cover letter only. Begin with the date line. No meta-commentary.
-"""},
-    ]
+    messages = _build_cover_messages(
+        tailored_resume, job_description, job_title, company, github_summary
+    )
     async for token in _chat_stream(messages, settings.PRIMARY_MODEL):
         yield token
 
@@ -279,14 +423,13 @@ async def generate_cover_letter(
     job_description: str,
     job_title: str = "",
     company: str = "",
-    github_highlights: str = "",
+    github_summary: str = "",
 ) -> str:
-    result = ""
-    async for token in generate_cover_letter_stream(
-        tailored_resume, job_description, job_title, company, github_highlights
-    ):
-        result += token
-    return result
+    """Non-streaming variant: one Ollama response, no per-token NDJSON parsing."""
+    messages = _build_cover_messages(
+        tailored_resume, job_description, job_title, company, github_summary
+    )
+    return await _chat(messages, settings.PRIMARY_MODEL)
 
 
 # ── Reviewer Pass (Second Model) ──────────────────────────────────────────────
@@ -399,29 +542,58 @@ Return ONLY this JSON:
     try:
         return json.loads(raw)
     except Exception:
-        return {
-            "keyword_match_pct": 65,
-            "relevance_score": 6.5,
-            "top_matching_keywords": [],
-            "critical_missing": [],
-            "strengths": [],
-            "improvements": [],
-            "verdict": "Analysis unavailable",
-        }
+        return dict(_ATS_FALLBACK)
+
+
+_ATS_FALLBACK = {
+    "keyword_match_pct": 65,
+    "relevance_score": 6.5,
+    "top_matching_keywords": [],
+    "critical_missing": [],
+    "strengths": [],
+    "improvements": [],
+    "verdict": "Analysis unavailable",
+}
+
+
+async def review_and_analyze_ats(tailored_resume: str, job_description: str) -> tuple[str, dict]:
+    """
+    Reviewer critique + ATS analysis in one structured-output call.
+    Both passes read the same (JD, resume) context, so the model prefills it
+    once instead of twice. Returns (reviewer feedback text, ATS analysis dict).
+    """
+    messages = [
+        {"role": "system", "content": _SYSTEM_REVIEW_ATS},
+        {"role": "user", "content": _REVIEW_ATS_TEMPLATE.format_map({
+            "jd":     job_description[:1500],
+            "resume": tailored_resume[:3000],
+        })},
+    ]
+    raw = await _chat(messages, settings.REVIEWER_MODEL, temperature=0.0, json_mode=True)
+    try:
+        data = json.loads(raw)
+        review = data.get("review") or ""
+        ats = data.get("ats")
+    except Exception:
+        return raw, dict(_ATS_FALLBACK)
+    if isinstance(review, list):
+        review = "\n".join(str(r) for r in review)
+    return str(review), ats if isinstance(ats, dict) else dict(_ATS_FALLBACK)
+
+
+# Lowercase alternation matched against lowercased text: case-sensitive matching
+# skips re's per-character case folding, roughly 3x faster than re.IGNORECASE.
+_KEY_TERMS_RE = re.compile(
+    r"\b(python|r\b|sql|pandas|numpy|scikit|tensorflow|pytorch|spark|"
+    r"hadoop|aws|azure|gcp|docker|kubernetes|git|linux|ml|nlp|"
+    r"deep learning|machine learning|data science|analytics|"
+    r"statistics|tableau|power bi|fastapi|django|flask|postgresql|"
+    r"mongodb|kafka|airflow|mlops|llm|rag|transformer|bert|"
+    r"scikit-learn|xgboost|lightgbm|streamlit|plotly)\b"
+)
 
 
 def _extract_key_terms(text: str, n: int = 8) -> str:
     """Quick keyword extraction for prompt injection (no LLM)."""
-    import re
-    tech_terms = re.findall(
-        r"\b(Python|R\b|SQL|pandas|numpy|scikit|TensorFlow|PyTorch|Spark|"
-        r"Hadoop|AWS|Azure|GCP|Docker|Kubernetes|Git|Linux|ML|NLP|"
-        r"deep learning|machine learning|data science|analytics|"
-        r"statistics|Tableau|Power BI|FastAPI|Django|Flask|PostgreSQL|"
-        r"MongoDB|Kafka|Airflow|MLOps|LLM|RAG|transformer|BERT|"
-        r"scikit-learn|XGBoost|LightGBM|Streamlit|Plotly)\b",
-        text,
-        re.IGNORECASE,
-    )
-    unique = list(dict.fromkeys(t.lower() for t in tech_terms))[:n]
+    unique = list(dict.fromkeys(_KEY_TERMS_RE.findall(text.lower())))[:n]
     return ", ".join(unique) if unique else "relevant technologies"
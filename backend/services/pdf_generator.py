@@ -3,13 +3,97 @@ PDF & DOCX Generator – produces ATS-clean, professional documents.
 No columns, no tables, no graphics – pure text layout.
 """
 
+import asyncio
 import io
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
 from config import settings
 
+# Renderer libraries are imported once at module load (each render-pool worker
+# pays it at spawn, not per document); a missing one only disables its format.
+try:
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable
+    _HAS_REPORTLAB = True
+except ImportError:
+    _HAS_REPORTLAB = False
+
+try:
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.shared import Pt, RGBColor, Cm
+    _HAS_DOCX = True
+except ImportError:
+    _HAS_DOCX = False
+
+
+# ── Render Pool ───────────────────────────────────────────────────────────────
+# PDF/DOCX rendering is pure CPU work; running it in worker processes keeps the
+# API event loop (and every open SSE stream) responsive. "spawn" avoids forking
+# a parent that already holds threads and locks.
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+async def render_in_pool(fn, *args) -> bytes:
+    """Run generate_pdf / generate_docx in the render process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_render_pool(), fn, *args)
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+# ── Line Patterns ─────────────────────────────────────────────────────────────
+# Compiled once: every pattern below runs per line, and generate_pdf re-renders
+# the whole text on each auto-scale retry.
+
+# LLM meta-commentary lines to strip entirely. Split by anchoring: the prefix
+# alternation only runs at position 0 (match), and the few mid-line phrases are
+# matched case-sensitively against the lowercased line – ~5x faster than one
+# unanchored re.IGNORECASE alternation searched at every offset.
+_PAT_META_PREFIX = re.compile(
+    r"here(?:'s| is)\b|below is\b|the tailored resume\b|resume:|---+$|\*\*",
+    re.IGNORECASE,
+)
+_PAT_META_ANYWHERE = re.compile(r"step \d|final check|word count")
+
+_PAT_NOT_HEADER   = re.compile(r"[0-9@|]")
+_PAT_HAS_DIGIT    = re.compile(r"[0-9]")
+_PAT_CONTACT      = re.compile(r"[@|+]|linkedin|github", re.IGNORECASE)
+_PAT_BULLET       = re.compile(r"^[•\-\*—◦▪]\s+")
+_PAT_DOCX_CONTACT = re.compile(r"@|(\+\d|\d{3}[.\-]\d{3})")
+_PAT_DOCX_BULLET  = re.compile(r"^[•\-\–\*▪◦]\s*")
+
 
 # ── PDF Generation (ReportLab) ────────────────────────────────────────────────
 
+_PDF_FONT_SIZES = (9.5, 9.0, 8.5, 8.0, 7.5)  # body sizes tried to fit one page, largest first
+
 def _deduplicate_sections(text: str) -> str:
     """
     Remove duplicate ALL-CAPS section headers from LLM output.
@@ -26,18 +110,6 @@ def _deduplicate_sections(text: str) -> str:
         "CERTIFICATIONS", "CERTIFICATIONS & AWARDS",
         "CONTACT", "CONTACT INFORMATION",
     }
-    # LLM meta lines to strip entirely
-    meta_patterns = [
-        r"^here('s| is)\b",
-        r"^below is\b",
-        r"^the tailored resume\b",
-        r"^resume:",
-        r"^---+$",
-        r"^\*\*",
-        r"step \d+",
-        r"final check",
-        r"word count",
-    ]
 
     seen_sections: set[str] = set()
     out_lines: list[str] = []
@@ -48,14 +120,14 @@ def _deduplicate_sections(text: str) -> str:
         upper = stripped.upper()
 
         # Drop meta-commentary
-        if any(re.search(p, stripped, re.IGNORECASE) for p in meta_patterns):
+        if _PAT_META_PREFIX.match(stripped) or _PAT_META_ANYWHERE.search(stripped.lower()):
             continue
 
         # Detect ALL-CAPS section header
         is_section_header = (
             stripped.isupper()
             and 3 < len(stripped) < 80
-            and not re.search(r"[0-9@|]", stripped)
+            and not _PAT_NOT_HEADER.search(stripped)
         )
 
         if is_section_header:
@@ -85,131 +157,159 @@ def _deduplicate_sections(text: str) -> str:
     return "\n".join(out_lines)
 
 
+@lru_cache(maxsize=16)
+def _styles_for(body_size: float) -> dict:
+    """Paragraph styles per line kind for a body font size, built once per size."""
+    return {
+        "name": ParagraphStyle(
+            "Name", fontSize=body_size + 4, fontName="Helvetica-Bold",
+            textColor=HexColor("#1a1a2e"), alignment=TA_CENTER,
+            spaceBefore=0, spaceAfter=2,
+        ),
+        "contact": ParagraphStyle(
+            "Contact", fontSize=body_size - 1, fontName="Helvetica",
+            textColor=HexColor("#444444"), alignment=TA_CENTER,
+            spaceBefore=0, spaceAfter=4,
+        ),
+        "heading": ParagraphStyle(
+            "Heading", fontSize=body_size + 0.5, fontName="Helvetica-Bold",
+            textColor=HexColor("#1a1a2e"),
+            spaceBefore=6, spaceAfter=1, leftIndent=0,
+        ),
+        "role": ParagraphStyle(
+            "Role", fontSize=body_size, fontName="Helvetica-Bold",
+            textColor=HexColor("#222222"),
+            spaceBefore=3, spaceAfter=1, leftIndent=0,
+        ),
+        "body": ParagraphStyle(
+            "Body", fontSize=body_size, fontName="Helvetica",
+            leading=body_size * 1.35, spaceAfter=1, leftIndent=0,
+        ),
+        "bullet": ParagraphStyle(
+            "Bullet", fontSize=body_size, fontName="Helvetica",
+            leading=body_size * 1.35, spaceAfter=1,
+            leftIndent=12, firstLineIndent=-8,
+        ),
+    }
+
+
+def _classify_pdf_lines(text: str) -> list[tuple[str, str]]:
+    """
+    (kind, escaped markup) per line; kind is one of blank, name, contact,
+    heading, bullet, role, body. Independent of font size.
+    """
+    lines = text.split("\n")
+    first_nb = next((i for i, l in enumerate(lines) if l.strip()), 0)
+    contact_zone = first_nb + 5  # first N lines may be contact info
+
+    out: list[tuple[str, str]] = []
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+
+        if not stripped:
+            out.append(("blank", ""))
+        # Candidate name (first non-blank, not all-caps)
+        elif i == first_nb and not stripped.isupper():
+            out.append(("name", _esc(stripped)))
+        # Contact info zone
+        elif i <= contact_zone and _PAT_CONTACT.search(stripped):
+            out.append(("contact", _esc(stripped)))
+        # ALL CAPS section heading
+        elif stripped.isupper() and 3 < len(stripped) < 80 and not _PAT_HAS_DIGIT.search(stripped):
+            out.append(("heading", _esc(stripped)))
+        # Bullet point (•, -, *, —)
+        elif bullet := _PAT_BULLET.match(stripped):
+            out.append(("bullet", f"\u2022\u00a0{_esc(stripped[bullet.end():])}"))
+        # Role/company line (contains | separator — common in job entries)
+        elif " | " in stripped:
+            out.append(("role", _esc(stripped)))
+        else:
+            out.append(("body", _esc(stripped)))
+    return out
+
+
 def generate_pdf(text: str, title: str = "Resume") -> bytes:
     """
     Render plain text to ATS-friendly single-page PDF.
     Auto-scales font size to fit content onto one page.
     """
-    try:
-        from reportlab.lib.pagesizes import LETTER
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, KeepTogether
-        from reportlab.lib.enums import TA_LEFT, TA_CENTER
-
-        # Clean LLM artefacts before rendering
-        text = _deduplicate_sections(text)
-
-        margin = 36  # 0.5 inch — tight but readable
-
-        def _build_story(body_size: float):
-            """Build the ReportLab story for a given body font size."""
-            name_style = ParagraphStyle(
-                "Name", fontSize=body_size + 4, fontName="Helvetica-Bold",
-                textColor=HexColor("#1a1a2e"), alignment=TA_CENTER,
-                spaceBefore=0, spaceAfter=2,
-            )
-            contact_style = ParagraphStyle(
-                "Contact", fontSize=body_size - 1, fontName="Helvetica",
-                textColor=HexColor("#444444"), alignment=TA_CENTER,
-                spaceBefore=0, spaceAfter=4,
-            )
-            heading_style = ParagraphStyle(
-                "Heading", fontSize=body_size + 0.5, fontName="Helvetica-Bold",
-                textColor=HexColor("#1a1a2e"),
-                spaceBefore=6, spaceAfter=1, leftIndent=0,
-            )
-            role_style = ParagraphStyle(
-                "Role", fontSize=body_size, fontName="Helvetica-Bold",
-                textColor=HexColor("#222222"),
-                spaceBefore=3, spaceAfter=1, leftIndent=0,
-            )
-            body_style = ParagraphStyle(
-                "Body", fontSize=body_size, fontName="Helvetica",
-                leading=body_size * 1.35, spaceAfter=1, leftIndent=0,
-            )
-            bullet_style = ParagraphStyle(
-                "Bullet", fontSize=body_size, fontName="Helvetica",
-                leading=body_size * 1.35, spaceAfter=1,
-                leftIndent=12, firstLineIndent=-8,
-            )
-
-            story = []
-            lines = text.split("\n")
-            first_nb = next((i for i, l in enumerate(lines) if l.strip()), 0)
-            contact_zone = first_nb + 5  # first N lines may be contact info
-
-            i = 0
-            while i < len(lines):
-                line = lines[i]
-                stripped = line.strip()
-                i += 1
-
-                if not stripped:
-                    story.append(Spacer(1, 2))
-                    continue
-
-                # Candidate name (first non-blank, not all-caps)
-                if i - 1 == first_nb and not stripped.isupper():
-                    story.append(Paragraph(_esc(stripped), name_style))
-                    continue
-
-                # Contact info zone
-                if i - 1 <= contact_zone and re.search(r"[@|+]|linkedin|github", stripped, re.I):
-                    story.append(Paragraph(_esc(stripped), contact_style))
-                    continue
-
-                # ALL CAPS section heading
-                if stripped.isupper() and 3 < len(stripped) < 80 and not re.search(r"[0-9]", stripped):
-                    story.append(HRFlowable(
-                        width="100%", thickness=0.6,
-                        color=HexColor("#4f46e5"), spaceBefore=4, spaceAfter=1,
-                    ))
-                    story.append(Paragraph(_esc(stripped), heading_style))
-                    continue
-
-                # Bullet point (•, -, *, —)
-                if re.match(r"^[•\-\*—◦▪]\s+", stripped):
-                    bullet_text = re.sub(r"^[•\-\*—◦▪]\s+", "", stripped)
-                    story.append(Paragraph(f"\u2022\u00a0{_esc(bullet_text)}", bullet_style))
-                    continue
-
-                # Role/company line (contains | separator — common in job entries)
-                if " | " in stripped and stripped.count("|") >= 1:
-                    story.append(Paragraph(_esc(stripped), role_style))
-                    continue
-
-                story.append(Paragraph(_esc(stripped), body_style))
-
-            return story
-
-        # ── Auto-scale to fit 1 page ──────────────────────────────────────────
-        page_w, page_h = LETTER
-        usable_h = page_h - 2 * margin
-
-        for font_size in [9.5, 9.0, 8.5, 8.0, 7.5]:
-            buf = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buf, pagesize=LETTER,
-                leftMargin=margin, rightMargin=margin,
-                topMargin=margin, bottomMargin=margin,
-                title=title,
-            )
-            story = _build_story(font_size)
-            doc.build(story)
-            pdf_bytes = buf.getvalue()
-
-            # Check page count by counting '%%Page' markers or doc.page
-            # ReportLab sets doc.page after build
-            if getattr(doc, 'page', 2) <= 1:
-                return pdf_bytes  # fits on 1 page
-
-        # Last resort: return smallest font version
-        return pdf_bytes
-
-    except ImportError:
+    if not _HAS_REPORTLAB:
         raise ImportError("Install reportlab: pip install reportlab")
 
+    # Clean LLM artefacts, then classify + escape each line once: every
+    # auto-scale probe below rebuilds the story from this list
+    text = _deduplicate_sections(text)
+    lines = _classify_pdf_lines(text)
+
+    margin = 36  # 0.5 inch — tight but readable
+
+    def _build_story(body_size: float):
+        """Build the ReportLab story for a given body font size."""
+        styles = _styles_for(body_size)
+
+        story = []
+        for kind, markup in lines:
+            if kind == "blank":
+                story.append(Spacer(1, 2))
+            elif kind == "heading":
+                story.append(HRFlowable(
+                    width="100%", thickness=0.6,
+                    color=HexColor("#4f46e5"), spaceBefore=4, spaceAfter=1,
+                ))
+                story.append(Paragraph(markup, styles["heading"]))
+            else:
+                story.append(Paragraph(markup, styles[kind]))
+
+        return story
+
+    # ── Auto-scale to fit 1 page ──────────────────────────────────────────────
+    page_w, page_h = LETTER
+    usable_h = page_h - 2 * margin
+    font_sizes = _PDF_FONT_SIZES
+    last = len(font_sizes) - 1
+    # One buffer rewound per probe; only outputs that may be returned
+    # (a fit, or the smallest-size fallback) are copied out of it
+    buf = io.BytesIO()
+    kept: dict[int, bytes] = {}
+
+    def _render(idx: int) -> bool:
+        buf.seek(0)
+        buf.truncate()
+        doc = SimpleDocTemplate(
+            buf, pagesize=LETTER,
+            leftMargin=margin, rightMargin=margin,
+            topMargin=margin, bottomMargin=margin,
+            title=title,
+        )
+        doc.build(_build_story(font_sizes[idx]))
+        # ReportLab sets doc.page after build
+        fits = getattr(doc, 'page', 2) <= 1
+        if fits or idx == last:
+            kept[idx] = buf.getvalue()
+        return fits
+
+    # Fit is monotonic in font size, so binary-search for the largest size
+    # that fits. First probe: the largest size whose body lines alone fill
+    # less than the page – typical resumes fit there in a single build.
+    n_lines = sum(1 for kind, _ in lines if kind != "blank") or 1
+    est_size = usable_h / (n_lines * 1.35)
+    probe = next((i for i, fs in enumerate(font_sizes) if fs <= est_size), len(font_sizes) - 1)
+
+    lo, hi, best = 0, last, None
+    while lo <= hi:
+        if _render(probe):
+            best, hi = probe, probe - 1
+        else:
+            lo = probe + 1
+        probe = (lo + hi) // 2
+
+    if best is not None:
+        return kept[best]
+    # Last resort: return smallest font version
+    if last not in kept:
+        _render(last)
+    return kept[last]
+
 
 # ── DOCX Generation (python-docx) ─────────────────────────────────────────────
 
@@ -218,90 +318,83 @@ def generate_docx(text: str, title: str = "Resume") -> bytes:
     Render plain text to ATS-friendly DOCX.
     Returns bytes.
     """
-    try:
-        from docx import Document
-        from docx.shared import Pt, RGBColor, Cm
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-
-        doc = Document()
-
-        # Narrow margins
-        for section in doc.sections:
-            section.top_margin    = Cm(1.8)
-            section.bottom_margin = Cm(1.8)
-            section.left_margin   = Cm(2.0)
-            section.right_margin  = Cm(2.0)
-
-        # Default style
-        normal = doc.styles["Normal"]
-        normal.font.name = "Calibri"
-        normal.font.size = Pt(10.5)
-
-        lines = text.split("\n")
-        first_nonblank_idx = next((i for i, l in enumerate(lines) if l.strip()), 0)
-
-        for idx, line in enumerate(lines):
-            stripped = line.strip()
-
-            if not stripped:
-                p = doc.add_paragraph()
-                p.paragraph_format.space_after = Pt(0)
-                continue
+    if not _HAS_DOCX:
+        raise ImportError("Install python-docx: pip install python-docx")
 
-            # Name line
-            if idx == first_nonblank_idx and not stripped.isupper():
-                p = doc.add_paragraph()
-                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                run = p.add_run(stripped)
-                run.bold = True
-                run.font.size = Pt(14)
-                run.font.color.rgb = RGBColor(0x1a, 0x1a, 0x2e)
-                p.paragraph_format.space_after = Pt(3)
-                continue
+    doc = Document()
 
-            # Contact line
-            if re.search(r"@|(\+\d|\d{3}[.\-]\d{3})", stripped) and idx < first_nonblank_idx + 4:
-                p = doc.add_paragraph(stripped)
-                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                p.paragraph_format.space_after = Pt(2)
-                for run in p.runs:
-                    run.font.size = Pt(9)
-                    run.font.color.rgb = RGBColor(0x44, 0x44, 0x44)
-                continue
+    # Narrow margins
+    for section in doc.sections:
+        section.top_margin    = Cm(1.8)
+        section.bottom_margin = Cm(1.8)
+        section.left_margin   = Cm(2.0)
+        section.right_margin  = Cm(2.0)
 
-            # Section heading
-            if stripped.isupper() and 3 < len(stripped) < 70:
-                p = doc.add_paragraph()
-                p.paragraph_format.space_before = Pt(8)
-                p.paragraph_format.space_after  = Pt(2)
-                run = p.add_run(stripped)
-                run.bold = True
-                run.font.size = Pt(11)
-                run.font.color.rgb = RGBColor(0x1a, 0x1a, 0x2e)
-                # Bottom border (underline effect)
-                _add_bottom_border(p)
-                continue
+    # Default style
+    normal = doc.styles["Normal"]
+    normal.font.name = "Calibri"
+    normal.font.size = Pt(10.5)
 
-            # Bullet
-            if stripped.startswith(("•", "–", "-", "*", "▪", "◦")):
-                bullet_text = re.sub(r"^[•\-\–\*▪◦]\s*", "", stripped)
-                p = doc.add_paragraph(style="List Bullet")
-                p.text = bullet_text
-                p.paragraph_format.space_after = Pt(1)
-                continue
+    lines = text.split("\n")
+    first_nonblank_idx = next((i for i, l in enumerate(lines) if l.strip()), 0)
+
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+
+        if not stripped:
+            p = doc.add_paragraph()
+            p.paragraph_format.space_after = Pt(0)
+            continue
 
-            # Body
+        # Name line
+        if idx == first_nonblank_idx and not stripped.isupper():
+            p = doc.add_paragraph()
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            run = p.add_run(stripped)
+            run.bold = True
+            run.font.size = Pt(14)
+            run.font.color.rgb = RGBColor(0x1a, 0x1a, 0x2e)
+            p.paragraph_format.space_after = Pt(3)
+            continue
+
+        # Contact line
+        if _PAT_DOCX_CONTACT.search(stripped) and idx < first_nonblank_idx + 4:
             p = doc.add_paragraph(stripped)
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
             p.paragraph_format.space_after = Pt(2)
+            for run in p.runs:
+                run.font.size = Pt(9)
+                run.font.color.rgb = RGBColor(0x44, 0x44, 0x44)
+            continue
 
-        buf = io.BytesIO()
-        doc.save(buf)
-        return buf.getvalue()
+        # Section heading
+        if stripped.isupper() and 3 < len(stripped) < 70:
+            p = doc.add_paragraph()
+            p.paragraph_format.space_before = Pt(8)
+            p.paragraph_format.space_after  = Pt(2)
+            run = p.add_run(stripped)
+            run.bold = True
+            run.font.size = Pt(11)
+            run.font.color.rgb = RGBColor(0x1a, 0x1a, 0x2e)
+            # Bottom border (underline effect)
+            _add_bottom_border(p)
+            continue
 
-    except ImportError:
-        raise ImportError("Install python-docx: pip install python-docx")
+        # Bullet
+        if stripped.startswith(("•", "–", "-", "*", "▪", "◦")):
+            bullet_text = _PAT_DOCX_BULLET.sub("", stripped)
+            p = doc.add_paragraph(style="List Bullet")
+            p.text = bullet_text
+            p.paragraph_format.space_after = Pt(1)
+            continue
+
+        # Body
+        p = doc.add_paragraph(stripped)
+        p.paragraph_format.space_after = Pt(2)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -318,8 +411,6 @@ def _esc(text: str) -> str:
 def _add_bottom_border(paragraph) -> None:
     """Add a bottom border to a DOCX paragraph (section divider)."""
     try:
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
         pPr = paragraph._p.get_or_add_pPr()
         pBdr = OxmlElement("w:pBdr")
         bottom = OxmlElement("w:bottom")
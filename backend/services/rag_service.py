@@ -10,26 +10,35 @@ Pipeline:
 """
 
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from functools import lru_cache
 
+import numpy as np
+from cachetools import LRUCache, TTLCache
 from fastembed import TextEmbedding
 from config import settings
 from database import get_chroma_collection
+from services.semantic_cache import normalize_jd, unit_vector, pack_vector, cosine_many
 
 
 # ── Embedding Model (lazy singleton) ─────────────────────────────────────────
 
+_EMBED_BATCH = 64       # texts per ONNX forward pass
+_ADD_BATCH   = 200      # records per Chroma add() transaction
+
+
 @lru_cache(maxsize=1)
 def get_embedding_model() -> TextEmbedding:
     "Load once, reuse everywhere. ONNX-based, no PyTorch needed."
     return TextEmbedding(model_name=settings.EMBEDDING_MODEL)
 
 
-def embed(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for a list of texts."""
+def embed(texts: List[str], batch_size: int = _EMBED_BATCH) -> List[List[float]]:
+    """Generate embeddings for a list of texts (batched ONNX forward passes)."""
     model = get_embedding_model()
-    return [e.tolist() for e in model.embed(texts)]
+    return [e.tolist() for e in model.embed(texts, batch_size=batch_size)]
 
 
 def embed_single(text: str) -> List[float]:
@@ -84,81 +93,33 @@ def _doc_id(user_id: int, source: str, chunk_index: int, content: str) -> str:
 
 
 # ── Indexing ──────────────────────────────────────────────────────────────────
+# Each source is (collection, filter for the user's old records, records to add);
+# index_* clear the user's previous chunks and embed the new ones in one pass.
 
-def index_resume(user_id: int, resume_text: str) -> int:
-    """
-    Chunk and embed the user's resume into ChromaDB.
-    Deletes old resume chunks for this user before re-indexing.
-    Returns number of chunks indexed.
-    """
-    collection = get_chroma_collection(settings.CHROMA_COLLECTION_RESUME)
+_Records = tuple[list[str], list[str], list[dict]]     # (chunks, ids, metadatas)
 
-    # Delete existing chunks for this user
-    try:
-        existing = collection.get(where={"user_id": user_id})
-        if existing["ids"]:
-            collection.delete(ids=existing["ids"])
-    except Exception:
-        pass
 
+def _resume_records(user_id: int, resume_text: str) -> _Records:
     chunks = chunk_text(resume_text)
-    if not chunks:
-        return 0
-
-    embeddings = embed(chunks)
     ids = [_doc_id(user_id, "resume", i, c) for i, c in enumerate(chunks)]
     metadatas = [{"user_id": user_id, "source": "resume", "chunk_index": i}
                  for i in range(len(chunks))]
+    return chunks, ids, metadatas
 
-    collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        documents=chunks,
-        metadatas=metadatas,
-    )
-    return len(chunks)
-
-
-def index_linkedin(user_id: int, about: str, experiences_text: str, skills_text: str) -> int:
-    """Embed LinkedIn profile content."""
-    collection = get_chroma_collection(settings.CHROMA_COLLECTION_EXPERIENCES)
-
-    # Remove old
-    try:
-        existing = collection.get(
-            where={"$and": [{"user_id": user_id}, {"source": "linkedin"}]}
-        )
-        if existing["ids"]:
-            collection.delete(ids=existing["ids"])
-    except Exception:
-        pass
 
+def _linkedin_records(user_id: int, about: str, experiences_text: str, skills_text: str) -> _Records:
     combined = "\n\n".join(filter(None, [about, experiences_text, skills_text]))
     if not combined.strip():
-        return 0
-
+        return [], [], []
     chunks = chunk_text(combined)
-    embeddings = embed(chunks)
     ids = [_doc_id(user_id, "linkedin", i, c) for i, c in enumerate(chunks)]
     metadatas = [{"user_id": user_id, "source": "linkedin", "chunk_index": i}
                  for i in range(len(chunks))]
+    return chunks, ids, metadatas
 
-    collection.add(ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
-    return len(chunks)
-
-
-def index_github_repos(user_id: int, repos: list[dict]) -> int:
-    """Embed GitHub repos (name + description + README)."""
-    collection = get_chroma_collection(settings.CHROMA_COLLECTION_GITHUB)
-
-    try:
-        existing = collection.get(where={"user_id": user_id})
-        if existing["ids"]:
-            collection.delete(ids=existing["ids"])
-    except Exception:
-        pass
 
-    all_chunks, all_embeddings, all_ids, all_meta = [], [], [], []
+def _github_records(user_id: int, repos: list[dict]) -> _Records:
+    all_chunks, all_ids, all_meta = [], [], []
     chunk_idx = 0
 
     for repo in repos:
@@ -175,17 +136,74 @@ def index_github_repos(user_id: int, repos: list[dict]) -> int:
             })
             chunk_idx += 1
 
-    if not all_chunks:
+    return all_chunks, all_ids, all_meta
+
+
+def _clear(collection, where: dict) -> None:
+    """Delete the records matching where (a user's previous chunks for a source)."""
+    try:
+        existing = collection.get(where=where)
+        if existing["ids"]:
+            collection.delete(ids=existing["ids"])
+    except Exception:
+        pass
+
+
+def _linkedin_filter(user_id: int) -> dict:
+    return {"$and": [{"user_id": user_id}, {"source": "linkedin"}]}
+
+
+def _reindex(collection_name: str, where: dict, records: _Records) -> int:
+    collection = get_chroma_collection(collection_name)
+    _clear(collection, where)
+    chunks, ids, metadatas = records
+    if not chunks:
         return 0
+    _add_batched(collection, ids, embed(chunks), chunks, metadatas)
+    return len(chunks)
 
-    all_embeddings = embed(all_chunks)
-    collection.add(
-        ids=all_ids,
-        embeddings=all_embeddings,
-        documents=all_chunks,
-        metadatas=all_meta,
+
+def index_resume(user_id: int, resume_text: str) -> int:
+    """
+    Chunk and embed the user's resume into ChromaDB.
+    Deletes old resume chunks for this user before re-indexing.
+    Returns number of chunks indexed.
+    """
+    invalidate_retrieval_cache(user_id)
+    return _reindex(
+        settings.CHROMA_COLLECTION_RESUME, {"user_id": user_id},
+        _resume_records(user_id, resume_text),
     )
-    return len(all_chunks)
+
+
+def index_linkedin(user_id: int, about: str, experiences_text: str, skills_text: str) -> int:
+    """Embed LinkedIn profile content."""
+    invalidate_retrieval_cache(user_id)
+    return _reindex(
+        settings.CHROMA_COLLECTION_EXPERIENCES, _linkedin_filter(user_id),
+        _linkedin_records(user_id, about, experiences_text, skills_text),
+    )
+
+
+def index_github_repos(user_id: int, repos: list[dict]) -> int:
+    """Embed GitHub repos (name + description + README)."""
+    invalidate_retrieval_cache(user_id)
+    return _reindex(
+        settings.CHROMA_COLLECTION_GITHUB, {"user_id": user_id},
+        _github_records(user_id, repos),
+    )
+
+
+def _add_batched(collection, ids: list, embeddings: list, documents: list, metadatas: list) -> None:
+    """One Chroma add() per _ADD_BATCH records: every repo / section in few transactions."""
+    for start in range(0, len(ids), _ADD_BATCH):
+        end = start + _ADD_BATCH
+        collection.add(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+        )
 
 
 def _repo_to_text(repo: dict) -> str:
@@ -207,51 +225,37 @@ def retrieve_for_jd(
     user_id: int,
     job_description: str,
     top_k: int = None,
+    jd_embedding: Optional[List[float]] = None,
 ) -> dict:
     """
     Main RAG retrieval: query all three collections for relevant context.
     Returns a dict with top chunks from each source + merged context string.
+    Pass jd_embedding when the caller already has it to skip re-embedding.
     """
     top_k = top_k or settings.RAG_TOP_K
-    jd_embedding = embed_single(job_description)
+    if jd_embedding is None:
+        jd_embedding = embed_single(job_description)
 
     results = {"resume": [], "linkedin": [], "github": [], "context": ""}
 
-    # Resume chunks
-    try:
-        resume_col = get_chroma_collection(settings.CHROMA_COLLECTION_RESUME)
-        r = resume_col.query(
-            query_embeddings=[jd_embedding],
-            n_results=min(top_k, 10),
-            where={"user_id": user_id},
-        )
-        results["resume"] = r["documents"][0] if r["documents"] else []
-    except Exception:
-        pass
-
-    # LinkedIn chunks
-    try:
-        exp_col = get_chroma_collection(settings.CHROMA_COLLECTION_EXPERIENCES)
-        r = exp_col.query(
-            query_embeddings=[jd_embedding],
-            n_results=min(top_k, 5),
-            where={"$and": [{"user_id": user_id}, {"source": "linkedin"}]},
-        )
-        results["linkedin"] = r["documents"][0] if r["documents"] else []
-    except Exception:
-        pass
-
-    # GitHub chunks
-    try:
-        gh_col = get_chroma_collection(settings.CHROMA_COLLECTION_GITHUB)
-        r = gh_col.query(
-            query_embeddings=[jd_embedding],
-            n_results=min(top_k, 5),
-            where={"user_id": user_id},
-        )
-        results["github"] = r["documents"][0] if r["documents"] else []
-    except Exception:
-        pass
+    # The three collections are independent HNSW indexes; hnswlib and sqlite
+    # release the GIL, so querying them concurrently costs max-of-three.
+    futures = {
+        "resume": _QUERY_POOL.submit(
+            _query_documents, settings.CHROMA_COLLECTION_RESUME, jd_embedding,
+            min(top_k, 10), {"user_id": user_id},
+        ),
+        "linkedin": _QUERY_POOL.submit(
+            _query_documents, settings.CHROMA_COLLECTION_EXPERIENCES, jd_embedding,
+            min(top_k, 5), {"$and": [{"user_id": user_id}, {"source": "linkedin"}]},
+        ),
+        "github": _QUERY_POOL.submit(
+            _query_documents, settings.CHROMA_COLLECTION_GITHUB, jd_embedding,
+            min(top_k, 5), {"user_id": user_id},
+        ),
+    }
+    for source, future in futures.items():
+        results[source] = future.result()
 
     # Build merged context string for LLM injection
     context_parts = []
@@ -269,16 +273,119 @@ def retrieve_for_jd(
     return results
 
 
-def compute_semantic_similarity(resume_text: str, jd_text: str) -> float:
+_QUERY_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="chroma-query")
+
+
+def _query_documents(collection_name: str, embedding: List[float], n_results: int, where: dict) -> list:
+    """Top-n documents from one collection; empty on a missing collection or filter miss."""
+    try:
+        r = get_chroma_collection(collection_name).query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=where,
+        )
+        return r["documents"][0] if r["documents"] else []
+    except Exception:
+        return []
+
+
+# ── Retrieval Cache ───────────────────────────────────────────────────────────
+# Retrieval is a pure function of (user's indexed sources, JD), so results are
+# kept per user until TTL or until any index_* call re-indexes that user.
+#   exact: (user_id, normalised-JD digest) → results
+#   soft:  per-user recent JD embeddings, cosine ≥ RAG_CACHE_THRESHOLD reuses results
+
+_retrieval_cache: TTLCache = TTLCache(maxsize=1024, ttl=settings.RAG_CACHE_TTL)
+_retrieval_jds: dict[int, list[tuple[str, tuple[np.ndarray, float]]]] = {}
+_retrieval_lock = threading.Lock()
+
+
+def invalidate_retrieval_cache(user_id: int) -> None:
+    with _retrieval_lock:
+        for digest, _ in _retrieval_jds.pop(user_id, []):
+            _retrieval_cache.pop((user_id, digest), None)
+
+
+def cached_retrieve_for_jd(
+    user_id: int,
+    job_description: str,
+    jd_embedding: Optional[List[float]] = None,
+) -> dict:
+    """retrieve_for_jd with an exact + near-duplicate JD cache in front."""
+    digest = hashlib.sha1(normalize_jd(job_description).encode()).hexdigest()
+    # TTLCache expires entries on every access, so all reads and writes hold the lock
+    with _retrieval_lock:
+        hit = _retrieval_cache.get((user_id, digest))
+    if hit is not None:
+        return hit
+
+    if jd_embedding is None:
+        jd_embedding = embed_single(job_description)
+    query = unit_vector(jd_embedding)
+
+    with _retrieval_lock:
+        recent = [(d, v) for d, v in _retrieval_jds.get(user_id, [])
+                  if (user_id, d) in _retrieval_cache]
+        if user_id in _retrieval_jds:
+            _retrieval_jds[user_id] = recent
+    if recent:
+        sims = cosine_many(query, [v for _, v in recent])
+        best = int(np.argmax(sims))
+        if sims[best] >= settings.RAG_CACHE_THRESHOLD:
+            with _retrieval_lock:
+                hit = _retrieval_cache.get((user_id, recent[best][0]))
+            if hit is not None:
+                return hit
+
+    results = retrieve_for_jd(user_id, job_description, jd_embedding=jd_embedding)
+    with _retrieval_lock:
+        _retrieval_cache[(user_id, digest)] = results
+        recent = _retrieval_jds.setdefault(user_id, [])
+        recent.append((digest, pack_vector(jd_embedding)))
+        del recent[:-20]
+    return results
+
+
+# Full-text (≤3000 char) embeddings used for similarity scoring: re-scoring the
+# same resume or JD within a session skips its ONNX forward pass entirely
+_similarity_vectors: LRUCache = LRUCache(maxsize=256)
+_similarity_lock = threading.Lock()
+
+
+def _similarity_unit_vectors(texts: List[str]) -> List[np.ndarray]:
+    """Unit embeddings for texts; cache misses share a single embed() call."""
+    keys = [hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest() for t in texts]
+    with _similarity_lock:
+        vectors = [_similarity_vectors.get(k) for k in keys]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        fresh = embed([texts[i] for i in missing])
+        with _similarity_lock:
+            for i, emb in zip(missing, fresh):
+                vectors[i] = _similarity_vectors[keys[i]] = unit_vector(emb)
+    return vectors
+
+
+def compute_semantic_similarity(
+    resume_text: str,
+    jd_text: str,
+    resume_embedding: Optional[List[float]] = None,
+    jd_embedding: Optional[List[float]] = None,
+) -> float:
     """
     Cosine similarity between full resume and JD embeddings.
-    Returns 0.0 – 1.0.
+    Returns 0.0 – 1.0. Precomputed embeddings skip the corresponding forward pass;
+    otherwise both texts are embedded together in one batch.
     """
-    from numpy import dot
-    from numpy.linalg import norm
-
-    r_emb = embed_single(resume_text[:3000])
-    j_emb = embed_single(jd_text[:3000])
-
-    similarity = dot(r_emb, j_emb) / (norm(r_emb) * norm(j_emb) + 1e-9)
-    return float(max(0.0, min(1.0, similarity)))
+    texts = []
+    if resume_embedding is None:
+        texts.append(resume_text[:3000])
+    if jd_embedding is None:
+        texts.append(jd_text[:3000])
+    computed = iter(_similarity_unit_vectors(texts))
+    r_vec = unit_vector(resume_embedding) if resume_embedding is not None else next(computed)
+    j_vec = unit_vector(jd_embedding) if jd_embedding is not None else next(computed)
+
+    # float32 unit vectors: cosine is one BLAS dot, no list → float64 round-trip
+    similarity = float(r_vec @ j_vec)
+    return max(0.0, min(1.0, similarity))
@@ -0,0 +1,69 @@
+"""
+Result Cache – memoises deterministic pipeline steps (ATS analysis + scoring).
+
+Keys are (namespace, user_id, blake2b of the inputs); values live in an
+in-process TTLCache. Concurrent misses on the same key share one computation.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable
+
+from cachetools import TTLCache
+
+from config import settings
+
+
+_results: TTLCache = TTLCache(maxsize=1024, ttl=settings.RESULT_CACHE_TTL)
+_inflight: dict[tuple, asyncio.Future] = {}
+
+
+def make_key(namespace: str, user_id: int, *parts: str) -> tuple[str, int, bytes]:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return namespace, user_id, h.digest()
+
+
+async def get_or_compute(key: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for key, or await compute() once and cache it."""
+    hit = _results.get(key)
+    if hit is not None:
+        return hit
+
+    while (pending := _inflight.get(key)) is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise                           # this waiter itself was cancelled
+        # The leader was cancelled (e.g. its client disconnected): don't fail
+        # this live request with it – take over, or join whoever already did
+        hit = _results.get(key)
+        if hit is not None:
+            return hit
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()                      # mark retrieved: no "never retrieved" warning
+        raise
+    finally:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    _results[key] = value
+    future.set_result(value)
+    return value
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached result for a user – call when their resume or skills change."""
+    for key in [k for k in list(_results.keys()) if k[1] == user_id]:
+        _results.pop(key, None)
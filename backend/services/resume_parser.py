@@ -7,6 +7,46 @@ import io
 import re
 from pathlib import Path
 
+# Parser libraries imported once at module load; missing ones are skipped
+try:
+    import pdfplumber
+    _HAS_PDFPLUMBER = True
+except ImportError:
+    _HAS_PDFPLUMBER = False
+
+try:
+    from PyPDF2 import PdfReader
+    _HAS_PYPDF2 = True
+except ImportError:
+    _HAS_PYPDF2 = False
+
+try:
+    from docx import Document
+    _HAS_DOCX = True
+except ImportError:
+    _HAS_DOCX = False
+
+
+# Section header patterns, compiled once as (section, exact, within): a line is
+# a header if it is exactly the keyword, or an ALL-CAPS line containing it.
+_HEADER_PATTERNS = {
+    "summary":        r"(professional\s+summary|summary|objective|profile|about\s+me)",
+    "education":      r"(education|academic|qualification)",
+    "experience":     r"(experience|work\s+history|employment|professional\s+experience)",
+    "skills":         r"(skill|technical\s+skill|core\s+competenc|technologies)",
+    "projects":       r"(project|personal\s+project|academic\s+project|key\s+project)",
+    "certifications": r"(certif|award|honor|achievement|course)",
+}
+_HEADER_RES = [
+    (sec, re.compile(rf"^\s*({pattern})\s*$", re.IGNORECASE), re.compile(pattern, re.IGNORECASE))
+    for sec, pattern in _HEADER_PATTERNS.items()
+]
+
+_CTRL_CHARS_RE  = re.compile(r"[^\x09\x0A\x0D\x20-\x7E\u00A0-\uFFFF]")
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+_CRLF_RE        = re.compile(r"\r\n?")
+_BLANK_RUN_RE   = re.compile(r"\n{3,}")
+
 
 # ── Main Entry ────────────────────────────────────────────────────────────────
 
@@ -50,16 +90,6 @@ def parse_sections(text: str) -> dict:
         "skills": "", "projects": "", "certifications": "", "other": "",
     }
 
-    # Patterns that match common section headers
-    header_patterns = {
-        "summary":        r"(professional\s+summary|summary|objective|profile|about\s+me)",
-        "education":      r"(education|academic|qualification)",
-        "experience":     r"(experience|work\s+history|employment|professional\s+experience)",
-        "skills":         r"(skill|technical\s+skill|core\s+competenc|technologies)",
-        "projects":       r"(project|personal\s+project|academic\s+project|key\s+project)",
-        "certifications": r"(certif|award|honor|achievement|course)",
-    }
-
     # Split text into lines
     lines = text.split("\n")
     current_section = "other"
@@ -73,12 +103,13 @@ def parse_sections(text: str) -> dict:
 
         # Check if this line is a section header
         matched_section = None
-        for sec, pattern in header_patterns.items():
-            if re.match(rf"^\s*({pattern})\s*$", stripped, re.IGNORECASE):
+        is_upper = stripped.isupper()
+        for sec, exact, within in _HEADER_RES:
+            if exact.match(stripped):
                 matched_section = sec
                 break
             # Also catch ALL CAPS headers
-            if stripped.isupper() and re.search(pattern, stripped, re.IGNORECASE):
+            if is_upper and within.search(stripped):
                 matched_section = sec
                 break
 
@@ -97,39 +128,40 @@ def parse_sections(text: str) -> dict:
 
 def _parse_pdf(file_bytes: bytes) -> str:
     # Try pdfplumber first (best quality)
-    try:
-        import pdfplumber
-        text_parts = []
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                try:
-                    page_text = page.extract_text(x_tolerance=2, y_tolerance=2)
-                except Exception:
-                    page_text = None
-                if page_text:
-                    text_parts.append(page_text)
-        if text_parts:
-            return _clean("\n".join(text_parts))
-    except Exception:
-        pass
+    if _HAS_PDFPLUMBER:
+        try:
+            text_parts = []
+            with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+                for page in pdf.pages:
+                    try:
+                        page_text = page.extract_text(x_tolerance=2, y_tolerance=2)
+                    except Exception:
+                        page_text = None
+                    if page_text:
+                        text_parts.append(page_text)
+            if text_parts:
+                return _clean("\n".join(text_parts))
+        except Exception:
+            pass
 
     # Fallback: PyPDF2
-    try:
-        from PyPDF2 import PdfReader
-        reader = PdfReader(io.BytesIO(file_bytes))
-        text = "\n".join(p.extract_text() or "" for p in reader.pages)
-        if text.strip():
-            return _clean(text)
-    except Exception:
-        pass
+    if _HAS_PYPDF2:
+        try:
+            reader = PdfReader(io.BytesIO(file_bytes))
+            text = "\n".join(p.extract_text() or "" for p in reader.pages)
+            if text.strip():
+                return _clean(text)
+        except Exception:
+            pass
 
     raise ValueError("Could not extract text from this PDF. "
                      "Try saving it as a plain-text PDF or uploading a DOCX/TXT instead.")
 
 
 def _parse_docx(file_bytes: bytes) -> str:
+    if not _HAS_DOCX:
+        raise ImportError("Install python-docx: pip install python-docx")
     try:
-        from docx import Document
         doc = Document(io.BytesIO(file_bytes))
         parts = [p.text for p in doc.paragraphs if p.text.strip()]
         # Extract table cells
@@ -139,15 +171,13 @@ def _parse_docx(file_bytes: bytes) -> str:
                     if cell.text.strip():
                         parts.append(cell.text.strip())
         return _clean("\n".join(parts))
-    except ImportError:
-        raise ImportError("Install python-docx: pip install python-docx")
     except Exception as exc:
         raise ValueError(f"Could not parse DOCX file: {exc}") from exc
 
 
 def _clean(text: str) -> str:
-    text = re.sub(r"[^\x09\x0A\x0D\x20-\x7E\u00A0-\uFFFF]", " ", text)
-    text = re.sub(r" {2,}", " ", text)
-    text = re.sub(r"\r\n?", "\n", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _CTRL_CHARS_RE.sub(" ", text)
+    text = _MULTI_SPACE_RE.sub(" ", text)
+    text = _CRLF_RE.sub("\n", text)
+    text = _BLANK_RUN_RE.sub("\n\n", text)
     return text.strip()
@@ -0,0 +1,143 @@
+"""
+Semantic Cache – reuses LLM outputs when a user re-optimizes for the same job.
+
+Lookup order:
+  1. Exact hit  – hash of (user_id, resume text, job title/company, normalised JD)
+  2. Soft hit   – same user + resume + title/company,
+                  JD embedding cosine ≥ SEMANTIC_CACHE_THRESHOLD
+
+Entries hold the generated texts and LLM analysis only; ATS scoring is cheap and
+always recomputed against the submitted JD.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+from cachetools import TTLCache
+
+from config import settings
+
+
+_entries: TTLCache = TTLCache(
+    maxsize=settings.SEMANTIC_CACHE_SIZE, ttl=settings.SEMANTIC_CACHE_TTL,
+)
+# (user_id, resume + job meta digest) → recent [(entry key, packed JD embedding)]
+_jd_index: dict[tuple[int, str], list[tuple[str, tuple[np.ndarray, float]]]] = {}
+_lock = threading.Lock()
+_MAX_JDS_PER_SCOPE = 20
+
+
+# ── Keys ──────────────────────────────────────────────────────────────────────
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_jd(jd: str) -> str:
+    """Case/whitespace-insensitive form of a JD, so re-pastes hash identically."""
+    return _WS_RE.sub(" ", jd).strip().lower()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _scope(user_id: int, resume_text: str, job_meta: str) -> tuple[int, str]:
+    # The cover letter names the role/company, so they are part of the scope
+    return user_id, _digest(f"{resume_text}\x00{normalize_jd(job_meta)}")
+
+
+def cache_key(user_id: int, resume_text: str, job_description: str, job_meta: str = "") -> str:
+    _, scope_digest = _scope(user_id, resume_text, job_meta)
+    raw = f"{user_id}|{scope_digest}|{_digest(normalize_jd(job_description))}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ── Vectors ───────────────────────────────────────────────────────────────────
+# Cached vectors are L2-normalised once, so cosine is a single dot product and
+# scoring many candidates is one matrix–vector multiply. With CACHE_VECTORS_INT8
+# they are stored as int8 plus a per-vector scale: a quarter of the memory,
+# cosine error well under the soft-hit thresholds.
+
+def unit_vector(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    return v / (np.linalg.norm(v) + 1e-9)
+
+
+def pack_vector(vec) -> tuple[np.ndarray, float]:
+    """Unit-normalise; quantise to (int8, scale) unless CACHE_VECTORS_INT8 is off."""
+    v = unit_vector(vec)
+    if not settings.CACHE_VECTORS_INT8:
+        return v, 1.0
+    scale = float(np.abs(v).max()) / 127 or 1.0
+    return np.clip(np.round(v / scale), -127, 127).astype(np.int8), scale
+
+
+def cosine_many(query: np.ndarray, packed: list[tuple[np.ndarray, float]]) -> np.ndarray:
+    """Cosine of a unit query against packed vectors (one sgemv, no Python loop)."""
+    if not packed:
+        return np.empty(0, dtype=np.float32)
+    matrix = np.stack([v for v, _ in packed]).astype(np.float32, copy=False)
+    scales = np.fromiter((s for _, s in packed), dtype=np.float32, count=len(packed))
+    return (matrix @ query) * scales
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def get(
+    user_id: int,
+    resume_text: str,
+    job_description: str,
+    job_meta: str = "",
+    jd_embedding: Optional[list[float]] = None,
+) -> Optional[dict]:
+    """
+    Return cached outputs or None.
+    Without jd_embedding only the exact tier is checked.
+    """
+    hit = _entries.get(cache_key(user_id, resume_text, job_description, job_meta))
+    if hit is not None or jd_embedding is None:
+        return hit
+
+    scope = _scope(user_id, resume_text, job_meta)
+    with _lock:
+        candidates = [(k, v) for k, v in _jd_index.get(scope, []) if k in _entries]
+        if scope in _jd_index:
+            _jd_index[scope] = candidates        # drop expired keys
+    if not candidates:
+        return None
+    sims = cosine_many(unit_vector(jd_embedding), [v for _, v in candidates])
+    best = int(np.argmax(sims))
+    if sims[best] < settings.SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return _entries.get(candidates[best][0])
+
+
+def put(
+    user_id: int,
+    resume_text: str,
+    job_description: str,
+    outputs: dict,
+    job_meta: str = "",
+    jd_embedding: Optional[list[float]] = None,
+) -> None:
+    """Store outputs: {tailored_resume, cover_letter, reviewer_feedback, llm_analysis}."""
+    key = cache_key(user_id, resume_text, job_description, job_meta)
+    _entries[key] = outputs
+    if jd_embedding is None:
+        return
+    scope = _scope(user_id, resume_text, job_meta)
+    with _lock:
+        entries = _jd_index.setdefault(scope, [])
+        entries.append((key, pack_vector(jd_embedding)))
+        del entries[:-_MAX_JDS_PER_SCOPE]
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget a user's near-duplicate index – call when RAG sources change."""
+    with _lock:
+        for scope in [s for s in _jd_index if s[0] == user_id]:
+            for key, _ in _jd_index.pop(scope):
+                _entries.pop(key, None)
@@ -769,7 +769,7 @@ def page_history():
     api = get_api()
 
     try:
-        apps = api.get("/api/applications?limit=100")
+        apps = api.get("/api/applications?limit=100&full=true")
     except Exception as e:
         st.error(f"Failed to load history: {e}")
         return
@@ -807,7 +807,8 @@ def page_history():
                     "Status",
                     ["draft", "applied", "interview", "rejected", "offer"],
                     index=["draft","applied","interview","rejected","offer"]
-                        .index(status),
+                        .index(status) if status in
+                        ("draft","applied","interview","rejected","offer") else 0,
                     key=f"st_{app['id']}",
                 )
                 if new_status != status:
@@ -1052,8 +1053,8 @@ def render_ats_score(result: dict, compact: bool = False) -> None:
 # ═════════════════════════════════════════════════════════════════════════════
 
 def _render_app_row(app: dict) -> None:
-    score  = app.get("ats_score", 0)
-    grade  = (app.get("ats_breakdown") or {}).get("grade", "—")
+    score  = app.get("ats_score") or 0
+    grade  = app.get("grade") or "—"
     color  = "#16a34a" if score >= 75 else "#ea580c" if score >= 55 else "#dc2626"
     title  = app.get("job_title") or "Untitled"
     comp   = app.get("company") or "—"